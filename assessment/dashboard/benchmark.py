@@ -0,0 +1,356 @@
+"""Offline benchmark: run the pipeline against local LLM and search stand-ins.
+
+    python dashboard/benchmark.py --rows 100 1000 10000 --mode direct agent
+
+No API key or network is needed. The fake chat model and the fake search
+have configurable latency, failure rate and rate-limit injection, so
+throughput changes can be measured on a laptop. For every run the report
+shows per-phase wall time, LLM/search calls per entity, time spent sleeping
+in the scheduler versus time the fakes spent working, and peak memory.
+
+    python dashboard/benchmark.py --rows 10000 100000 --entity-state
+
+compares the memory and per-stage overhead of the pipeline's EntityBatch
+records with the plain list of dicts they replaced, without running the
+pipeline.
+"""
+import argparse
+import contextlib
+import hashlib
+import json
+import logging
+import random
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from types import SimpleNamespace
+import pandas as pd
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableLambda
+from services.data_processor import (
+    build_entity_index,
+    process_search_queries,
+    process_queries_with_delay,
+    process_queries_direct,
+    final_processing,
+    process_entities_streaming,
+    behaviour_control
+)
+from services.entity_batch import EntityBatch
+from services.extractors import FastPathExtractor
+from services.llm_cache import render_prompt
+from services.llm_pool import KeyState, LLMPool
+from services.llm_service import get_search_query_prompt, setup_agent_executor
+from services.progress import ProgressReporter
+from services.result_store import ResultTable, format_row
+from services.scheduler import AdaptiveScheduler
+
+
+class FakeRateLimitError(Exception):
+    """Looks like a Groq 429 to is_rate_limit_error and retry_after_from_error."""
+
+    def __init__(self, retry_after):
+        super().__init__("Error code: 429 - {'error': {'code': 'rate_limit_exceeded'}}")
+        self.response = SimpleNamespace(headers={"retry-after": str(retry_after)})
+
+
+class FakeService:
+    """Latency, failure and rate-limit injection shared by the fake LLM and search."""
+
+    def __init__(self, latency=0.05, jitter=0.5, failure_rate=0.0, rate_limit_rate=0.0, retry_after=0.5, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.calls = 0
+        self.failures = 0
+        self.rate_limited = 0
+        self.busy = 0.0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _call(self):
+        """Simulate one round-trip; raises the injected errors."""
+        with self._lock:
+            self.calls += 1
+            roll = self._random.random()
+            delay = self.latency * self._random.uniform(1 - self.jitter, 1 + self.jitter)
+            self.busy += delay
+        time.sleep(delay)
+        if roll < self.rate_limit_rate:
+            with self._lock:
+                self.rate_limited += 1
+            raise FakeRateLimitError(self.retry_after)
+        if roll < self.rate_limit_rate + self.failure_rate:
+            with self._lock:
+                self.failures += 1
+            raise RuntimeError("Injected failure")
+
+
+class FakeChatModel(FakeService):
+    """Stand-in for ChatGroq that gives a well-formed answer to every prompt the pipeline sends."""
+
+    model_name = "fake-chat"
+    temperature = 0.0
+
+    def invoke(self, prompt, stop=None, **kwargs):
+        self._call()
+        return AIMessage(content=self.answer(render_prompt(prompt)))
+
+    def bind(self, **kwargs):
+        return RunnableLambda(lambda prompt: self.invoke(prompt, **kwargs))
+
+    @staticmethod
+    def _queries(text, user_query):
+        digest = hashlib.md5(text.encode("utf-8")).hexdigest()[:8]
+        return [f"{user_query} {digest}", f"{user_query} {digest} latest figures"]
+
+    def answer(self, text):
+        if "precise data extraction assistant" in text:
+            number = int(hashlib.md5(text.encode("utf-8")).hexdigest()[:6], 16)
+            return json.dumps(["Population", str(number)])
+        user_query = re.search(r"User's query: (.*)", text)
+        user_query = user_query.group(1).strip() if user_query else "query"
+        batch = re.search(r"keyed by row index: (.*)", text)
+        if batch:
+            entities = json.loads(batch.group(1))
+            return json.dumps({key: self._queries(json.dumps(value), user_query) for key, value in entities.items()})
+        if "Data from selected columns" in text:
+            return json.dumps(self._queries(text, user_query))
+        # Agent turns: search once, then answer from the observation in the scratchpad
+        question, _, scratchpad = text.rpartition("Question: ")[2].partition("\n")
+        if "<observation>" in scratchpad:
+            return "<final_answer>The population is around 120,000 residents.</final_answer>"
+        return f"<tool>search</tool><tool_input>{question or 'query'}"
+
+
+class FakeSearch(FakeService):
+    """Stand-in for DuckDuckGo returning deterministic snippets."""
+
+    def __call__(self, query):
+        self._call()
+        number = int(hashlib.md5(query.encode("utf-8")).hexdigest()[:5], 16)
+        return (f"[snippet: Official statistics for {query}. The population is {number:,} people "
+                f"according to the latest census., title: {query}, link: https://example.org/{number}]")
+
+
+def make_dataset(rows, unique_ratio=0.2, seed=0):
+    """Synthetic County/Country frame with repeated and inconsistently formatted entities."""
+    rng = random.Random(seed)
+    unique = max(1, int(rows * unique_ratio))
+    counties, countries = [], []
+    for _ in range(rows):
+        i = rng.randrange(unique)
+        county = f"County {i}"
+        variant = rng.random()
+        if variant < 0.1:
+            county = county.upper()
+        elif variant < 0.2:
+            county = f" {county} "
+        counties.append(county)
+        countries.append(f"Country {i % 25}")
+    return pd.DataFrame({"County": counties, "Country": countries, "Row": range(rows)})
+
+
+@contextlib.contextmanager
+def _timed(phases, name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        phases[name] = time.perf_counter() - start
+
+
+def run_benchmark(rows, mode="direct", streaming=False, keys=2, rate=20.0, batch_size=10, workers=4,
+                  query="Population of the county", llm_latency=0.05, search_latency=0.05,
+                  failure_rate=0.0, rate_limit_rate=0.0, retry_after=0.5, fast_path=True, seed=0):
+    """Run the pipeline once over a synthetic dataset of `rows` rows and return the measurements."""
+    clients = [
+        FakeChatModel(llm_latency, failure_rate=failure_rate, rate_limit_rate=rate_limit_rate,
+                      retry_after=retry_after, seed=seed + i)
+        for i in range(keys)
+    ]
+    llm = LLMPool([KeyState(f"FAKE_KEY_{i}", client) for i, client in enumerate(clients)],
+                  FakeChatModel.model_name, 0.0, quarantine_seconds=retry_after)
+    search = FakeSearch(search_latency, failure_rate=failure_rate, seed=seed)
+    scheduler = AdaptiveScheduler(rate=rate, max_rate=max(20.0, 4 * rate), base_backoff=retry_after)
+    extractor = FastPathExtractor() if fast_path else None
+    reporter = ProgressReporter()
+    phases = {}
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    with _timed(phases, "load"):
+        df = make_dataset(rows, seed=seed)
+        entity_index = build_entity_index(df, ["County", "Country"])
+        entities = entity_index.records
+    results = ResultTable(entity_index=entity_index)
+
+    if streaming:
+        agent_executor = None
+        if mode == "agent":
+            with _timed(phases, "agent setup"):
+                agent_executor = setup_agent_executor(llm, reporter=reporter, search_fn=search)
+        with _timed(phases, "pipeline"):
+            process_entities_streaming(entities, llm, get_search_query_prompt(), query, agent_executor,
+                                       llm, behaviour_control, results=results, fast_path=extractor,
+                                       scheduler=scheduler, search_fn=search, reporter=reporter)
+    else:
+        with _timed(phases, "queries"):
+            process_search_queries(entities, llm, get_search_query_prompt(), query, max_workers=workers,
+                                   scheduler=scheduler, batch_size=batch_size, reporter=reporter)
+        if mode == "agent":
+            with _timed(phases, "agent setup"):
+                agent_executor = setup_agent_executor(llm, reporter=reporter, search_fn=search)
+            with _timed(phases, "search"):
+                process_queries_with_delay(entities, agent_executor, scheduler=scheduler, max_workers=workers,
+                                           reporter=reporter)
+        else:
+            with _timed(phases, "search"):
+                process_queries_direct(entities, search, max_workers=workers, reporter=reporter)
+        with _timed(phases, "extract"):
+            final_processing(entities, llm, behaviour_control, results=results, fast_path=extractor,
+                             scheduler=scheduler, reporter=reporter)
+    total = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    llm_calls = sum(client.calls for client in clients)
+    return {
+        "rows": rows,
+        "entities": len(entities),
+        "mode": mode + (" streaming" if streaming else ""),
+        "phases": phases,
+        "total_s": total,
+        "llm_calls": llm_calls,
+        "llm_calls_per_entity": llm_calls / len(entities),
+        "search_calls": search.calls,
+        "search_calls_per_entity": search.calls / len(entities),
+        "rate_limits": sum(client.rate_limited for client in clients),
+        "failures": sum(client.failures for client in clients) + search.failures,
+        "slept_s": scheduler.slept,
+        "work_s": sum(client.busy for client in clients) + search.busy,
+        "result_rows": len(results),
+        "peak_mb": peak / 1024 / 1024,
+    }
+
+
+def benchmark_entity_state(rows, seed=0):
+    """Build every entity of a `rows`-row dataset as dicts and as an EntityBatch and time the stage passes.
+
+    Each pass does what the pipeline does to every entity: set its search
+    queries, its search results and its answer, then flatten it into an
+    output row. Timings are taken without tracemalloc; memory is measured
+    in a second, traced run, after building and after the last pass.
+    """
+    df = make_dataset(rows, unique_ratio=1.0, seed=seed)
+    columns = ["County", "Country"]
+    builders = {
+        "dicts": lambda: df[columns].to_dict(orient='records'),
+        "batch": lambda: EntityBatch.from_frame(df, columns),
+    }
+    passes = {
+        "queries": lambda entity: entity.__setitem__('search_queries', [f"Population of {entity['County']}"]),
+        "search": lambda entity: entity.__setitem__('one_value', ["About 120000 people live there."]),
+        "extract": lambda entity: entity.__setitem__('Population', "120000"),
+        "collect": format_row,
+    }
+
+    def run(build, phases):
+        with _timed(phases, "build"):
+            entities = build()
+        for stage, apply in passes.items():
+            with _timed(phases, stage):
+                for entity in entities:
+                    apply(entity)
+
+    reports = []
+    for name, build in builders.items():
+        phases = {}
+        run(build, phases)
+        tracemalloc.start()
+        entities = build()
+        built, _ = tracemalloc.get_traced_memory()
+        for apply in passes.values():
+            for entity in entities:
+                apply(entity)
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del entities
+        reports.append({"rows": rows, "state": name, "phases": phases,
+                        "built_mb": built / 1024 / 1024, "memory_mb": current / 1024 / 1024})
+    return reports
+
+
+def format_entity_state_report(report):
+    phases = ", ".join(f"{name} {seconds * 1000:.0f}ms" for name, seconds in report["phases"].items())
+    return (f"{report['rows']:>7,} entities [{report['state']}]: {report['built_mb']:.1f} MB built, "
+            f"{report['memory_mb']:.1f} MB after all stages ({phases})")
+
+
+def format_report(report):
+    phases = ", ".join(f"{name} {seconds:.2f}s" for name, seconds in report["phases"].items())
+    return (
+        f"{report['rows']:>7,} rows / {report['entities']:>6,} entities [{report['mode']}]: "
+        f"{report['total_s']:.2f}s ({phases})\n"
+        f"    LLM {report['llm_calls_per_entity']:.2f} calls/entity, "
+        f"search {report['search_calls_per_entity']:.2f} calls/entity, "
+        f"{report['rate_limits']} rate limits, {report['failures']} failures\n"
+        f"    slept {report['slept_s']:.2f}s vs worked {report['work_s']:.2f}s (summed over threads), "
+        f"peak memory {report['peak_mb']:.1f} MB"
+    )
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline offline with fake LLM and search backends.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[100, 1000], help="Dataset sizes (100 - 100000)")
+    parser.add_argument("--mode", nargs="+", choices=["direct", "agent"], default=["direct"])
+    parser.add_argument("--streaming", action="store_true", help="Use the streaming pipeline instead of phases")
+    parser.add_argument("--keys", type=int, default=2, help="Number of fake API keys in the pool")
+    parser.add_argument("--rate", type=float, default=20.0, help="Initial scheduler rate (requests/s)")
+    parser.add_argument("--batch-size", type=int, default=10)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Mean fake LLM latency (s)")
+    parser.add_argument("--search-latency", type=float, default=0.05, help="Mean fake search latency (s)")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Share of calls that fail")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Share of LLM calls that are rate limited")
+    parser.add_argument("--retry-after", type=float, default=0.5, help="Retry-After of injected rate limits (s)")
+    parser.add_argument("--no-fast-path", action="store_true", help="Always call the LLM for extraction")
+    parser.add_argument("--entity-state", action="store_true",
+                        help="Compare entity dicts with EntityBatch records instead of running the pipeline")
+    parser.add_argument("--json", help="Also write the reports to this JSON file")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.ERROR)
+    reports = []
+    if args.entity_state:
+        for rows in args.rows:
+            for report in benchmark_entity_state(rows):
+                print(format_entity_state_report(report), flush=True)
+                reports.append(report)
+        args.mode = []
+    for mode in args.mode:
+        for rows in args.rows:
+            report = run_benchmark(
+                rows, mode=mode, streaming=args.streaming, keys=args.keys, rate=args.rate,
+                batch_size=args.batch_size, workers=args.workers, llm_latency=args.llm_latency,
+                search_latency=args.search_latency, failure_rate=args.failure_rate,
+                rate_limit_rate=args.rate_limit_rate, retry_after=args.retry_after,
+                fast_path=not args.no_fast_path
+            )
+            print(format_report(report), flush=True)
+            reports.append(report)
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(reports, file, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
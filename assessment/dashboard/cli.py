@@ -0,0 +1,139 @@
+"""Headless batch runner: enrich a file without the Streamlit UI.
+
+    python dashboard/cli.py companies.csv --columns Company Country \\
+        --query "Get me the headquarters city of the company" --output results.csv
+
+The unique entities are split into one shard per worker process and every
+shard gets its own slice of the GROQ_API_KEY* keys. Shard results are merged
+and fanned back out to every source row at the end. Stage results are
+checkpointed, so re-running the same command resumes an interrupted job.
+"""
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dotenv import load_dotenv
+from services.cache_store import SQLiteCache, cache_path
+from services.checkpoint import CheckpointStore, JobCheckpoint, make_job_id
+from services.data_processor import build_entity_index
+from services.enrichment import run_enrichment
+from services.entity_index import NORMALIZATIONS
+from services.extractors import FastPathExtractor
+from services.file_reader import read_frame
+from services.llm_cache import CachedLLM
+from services.llm_pool import LLMPool, discover_api_keys
+from services.llm_service import get_search_query_prompt, setup_agent_executor, run_search
+from services.progress import ConsoleReporter
+from services.result_store import ResultTable
+from services.scheduler import AdaptiveScheduler
+from services.search_cache import SearchCache
+
+
+MODEL_NAME = "mixtral-8x7b-32768"
+
+
+def _run_shard(shard_index, keys, entities, selected_columns, query, mode, batch_size):
+    """Run all four phases over one shard in a worker process and return its entities."""
+    reporter = ConsoleReporter(prefix=f"[shard {shard_index}] ")
+    llm = CachedLLM(
+        LLMPool.from_keys(keys, model_name=MODEL_NAME, temperature=0.0),
+        SQLiteCache(cache_path("llm_responses.sqlite"))
+    )
+    search_cache = SearchCache(
+        ttl=24 * 3600,
+        disk_cache=SQLiteCache(cache_path("search_results.sqlite"), max_age=24 * 3600, max_bytes=64 * 1024 * 1024)
+    )
+    checkpoint = JobCheckpoint(
+        CheckpointStore(cache_path("checkpoints.sqlite")),
+        make_job_id(selected_columns, query, MODEL_NAME),
+        selected_columns
+    )
+    scheduler = AdaptiveScheduler(rate=0.5 * len(keys))
+    fast_path = FastPathExtractor()
+
+    reporter.info(f"{len(entities)} entities, {len(keys)} API key(s)")
+    agent_executor = None
+    if mode == "agent":
+        agent_executor = setup_agent_executor(llm, search_cache=search_cache, reporter=reporter)
+    run_enrichment(
+        entities, query, llm, get_search_query_prompt(), ResultTable(), reporter=reporter, mode=mode,
+        agent_executor=agent_executor, search_fn=lambda search_query: run_search(search_query, search_cache),
+        checkpoint=checkpoint, fast_path=fast_path, scheduler=scheduler, batch_size=batch_size
+    )
+    return entities
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Enrich a CSV/Excel/Parquet/Arrow file without the dashboard.")
+    parser.add_argument("input", help="Path of the input file")
+    parser.add_argument("--columns", nargs="+", required=True, help="Columns that identify an entity")
+    parser.add_argument("--query", required=True, help="What to look up for every entity")
+    parser.add_argument("--output", default="output.csv", help="Output file (.csv, .parquet or .xlsx)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Worker processes (default and maximum: one per API key)")
+    parser.add_argument("--mode", choices=["agent", "direct"], default="agent",
+                        help="agent: an LLM agent drives each search; direct: raw search results go to extraction")
+    parser.add_argument("--normalize", nargs="*", choices=list(NORMALIZATIONS), default=list(NORMALIZATIONS),
+                        help="Normalizations applied before deduplicating entities")
+    parser.add_argument("--batch-size", type=int, default=10, help="Entities per query generation request")
+    return parser.parse_args(argv)
+
+
+def output_format(path):
+    extension = os.path.splitext(path)[1].lower()
+    return {".parquet": "Parquet", ".xlsx": "Excel"}.get(extension, "CSV")
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    load_dotenv()
+    reporter = ConsoleReporter()
+
+    keys = discover_api_keys()
+    if not keys:
+        reporter.error("No API keys found. Set GROQ_API_KEY_1, GROQ_API_KEY_2, ... in your .env file")
+        return 1
+
+    df = read_frame(args.input, args.input, columns=args.columns)
+    entity_index = build_entity_index(df, args.columns, args.normalize)
+    records = entity_index.records
+    if not records:
+        reporter.error("No data to process from selected columns")
+        return 1
+
+    workers = max(1, min(args.workers or len(keys), len(keys), len(records)))
+    reporter.info(f"{len(records)} unique entities from {len(df):,} rows, {workers} worker process(es)")
+
+    # Shard i holds records i, i + workers, ... so the merge can put results back by position
+    failed = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(_run_shard, i, keys[i::workers], records[i::workers], args.columns, args.query,
+                            args.mode, args.batch_size): i
+            for i in range(workers)
+        }
+        for future in as_completed(futures):
+            i = futures[future]
+            try:
+                shard = future.result()
+            except Exception as e:
+                failed += 1
+                reporter.error(f"Shard {i} failed: {e}")
+                continue
+            for record, result in zip(records[i::workers], shard):
+                record.merge_results(result)
+
+    fmt = output_format(args.output)
+    results = ResultTable(args.output if fmt == "CSV" else None, entity_index=entity_index)
+    results.add_many(records)
+    if fmt != "CSV":
+        with open(args.output, "wb") as file:
+            file.write(results.to_bytes(fmt))
+    reporter.success(f"{len(results)} rows written to {args.output}")
+    if failed:
+        reporter.warning(f"{failed} shard(s) failed; re-run the same command to resume them")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
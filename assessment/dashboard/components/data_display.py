@@ -21,6 +21,16 @@ def show_column_selector(df):
     
     return selected_columns
 
+def show_normalization_options(options):
+    """Let the user choose how selected column values are normalized before deduplication."""
+    return st.sidebar.multiselect(
+        "Key normalization",
+        options=list(options),
+        default=list(options),
+        format_func=options.get,
+        help="Values that match after normalization are processed once and shared by all their rows"
+    )
+
 def display_dataframe(df):
     st.dataframe(df, use_container_width=True, height=400)
 
@@ -1,24 +1,93 @@
+import hashlib
+import threading
+from collections import OrderedDict
 import streamlit as st
 import pandas as pd
-from streamlit_gsheets import GSheetsConnection
+from services.file_reader import read_frame
 
-def load_file(uploaded_file):
+
+PREVIEW_ROWS = 1000
+
+
+class FrameCache:
+    """LRU cache of parsed DataFrames keyed by content hash, bounded by memory use.
+
+    It lives at module level, so it survives Streamlit reruns of `main()` and
+    re-selecting columns or typing a query never triggers another parse.
+    """
+
+    def __init__(self, max_bytes=1024 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._frames = OrderedDict()  # content hash -> (frame, size in bytes)
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._frames.get(key)
+            if entry is None:
+                return None
+            self._frames.move_to_end(key)
+            return entry[0]
+
+    def put(self, key, frame):
+        size = int(frame.memory_usage(deep=True).sum())
+        with self._lock:
+            if key in self._frames:
+                self._total_bytes -= self._frames.pop(key)[1]
+            self._frames[key] = (frame, size)
+            self._total_bytes += size
+            # Always keep the newest frame, even if it alone exceeds the budget
+            while len(self._frames) > 1 and self._total_bytes > self.max_bytes:
+                _, (_, evicted_size) = self._frames.popitem(last=False)
+                self._total_bytes -= evicted_size
+
+
+_frame_cache = FrameCache()
+_hash_by_file_id = {}
+
+
+def content_hash(uploaded_file):
+    """Hash the upload's bytes once per Streamlit file id."""
+    file_id = getattr(uploaded_file, "file_id", None)
+    if file_id is not None and file_id in _hash_by_file_id:
+        return _hash_by_file_id[file_id]
+    digest = hashlib.blake2b(uploaded_file.getbuffer(), digest_size=20).hexdigest()
+    if file_id is not None:
+        _hash_by_file_id[file_id] = digest
+    return digest
+
+
+def load_file(uploaded_file, columns=None, nrows=None):
     try:
-        if uploaded_file.name.endswith('.csv'):
-            try:
-                return pd.read_csv(uploaded_file)
-            except UnicodeDecodeError:
-                return pd.read_csv(uploaded_file, encoding='latin-1')
-        else:
-            return pd.read_excel(uploaded_file)
+        key = (content_hash(uploaded_file), tuple(columns) if columns is not None else None, nrows)
+        cached = _frame_cache.get(key)
+        if cached is not None:
+            return cached
+
+        df = read_frame(uploaded_file, uploaded_file.name, columns=columns, nrows=nrows)
+        _frame_cache.put(key, df)
+        return df
     except Exception as e:
         st.sidebar.error(f":red[Error reading file: {str(e)}]")
         return None
 
-def load_gsheets(url):
+@st.cache_resource(show_spinner=False)
+def get_sheet_sync():
+    """Process-wide sheet cache; writes go through gspread when a service account is configured."""
+    from services.sheets_sync import SheetSync, GspreadBackend, ConnectionBackend
+    secrets = st.secrets.get("connections", {}).get("gsheets", {})
+    if "private_key" in secrets:
+        import gspread
+        info = {key: value for key, value in secrets.items() if key not in ("spreadsheet", "worksheet")}
+        return SheetSync(GspreadBackend(gspread.service_account_from_dict(info)))
+    from streamlit_gsheets import GSheetsConnection
+    return SheetSync(ConnectionBackend(st.connection("gsheets", type=GSheetsConnection)))
+
+
+def load_gsheets(url, force=False):
     try:
-        conn = st.connection("gsheets", type=GSheetsConnection)
-        return conn.read(spreadsheet=url, ttl=5)
+        return get_sheet_sync().load(url, force=force)
     except Exception as e:
         st.sidebar.error(f"""
             Connection failed. Please check:
@@ -38,27 +107,97 @@ def show_data_source_selector():
 def handle_file_upload():
     with st.sidebar:
         uploaded_file = st.file_uploader(
-            label="Upload CSV/Excel File",
-            type=["csv", "xlsx"],
+            label="Upload CSV/Excel/Parquet/Arrow File",
+            type=["csv", "xlsx", "parquet", "feather", "arrow"],
             help="Upload your inventory data file here"
         )
+        large_file_mode = st.checkbox(
+            "Large file mode",
+            help="Preview the first rows only and load just the selected columns when processing"
+        )
+        st.session_state.source_file = uploaded_file if large_file_mode else None
+        st.session_state.sheet_url = None
+        st.session_state.source_fingerprint = content_hash(uploaded_file) if uploaded_file is not None else None
         if uploaded_file is not None:
-            data = load_file(uploaded_file)
+            data = load_file(uploaded_file, nrows=PREVIEW_ROWS if large_file_mode else None)
             if data is not None:
                 st.sidebar.success(":green[File uploaded successfully!]")
+                if large_file_mode:
+                    st.sidebar.caption(f"Large file mode: previewing the first {PREVIEW_ROWS:,} rows")
             return data
     return None
 
+
+def load_selected_columns(df, selected_columns):
+    """Return the frame to process: in large file mode, only the selected columns of the whole file."""
+    source_file = st.session_state.get('source_file')
+    if source_file is None:
+        return df
+    return load_file(source_file, columns=selected_columns)
+
+def data_fingerprint(df, selected_columns):
+    """Identify the data a job runs on, so a different upload or sheet never picks up its results."""
+    parts = [st.session_state.get('source_fingerprint') or ""]
+    if st.session_state.get('sheet_url'):
+        # Sheets change in place, so the URL alone is not enough; written-back columns don't count.
+        # Row hashes are combined in order: results are mapped back to sheet rows by position
+        row_hashes = pd.util.hash_pandas_object(df[list(selected_columns)].astype(str), index=False)
+        parts.append(hashlib.blake2b(row_hashes.to_numpy().tobytes(), digest_size=16).hexdigest())
+    return hashlib.blake2b("\n".join(parts).encode("utf-8"), digest_size=8).hexdigest()
+
+
 def handle_gsheets_connection():
+    st.session_state.source_file = None
     with st.sidebar:
         st.markdown("### Google Sheets Connection")
         url = st.text_input(
             "Enter Google Sheets URL",
             placeholder="Paste your Google Sheets URL here..."
         )
+        st.session_state.sheet_url = url or None
+        st.session_state.source_fingerprint = url or None
         if url:
-            data = load_gsheets(url)
+            # The sheet is only downloaded again once its revision changes
+            data = load_gsheets(url, force=st.button("Reload sheet"))
             if data is not None:
                 st.sidebar.success("Connected to Google Sheets!")
+                changed = len(get_sheet_sync().changed_rows(url))
+                if 0 < changed < len(data):
+                    st.sidebar.caption(
+                        f"{changed:,} of {len(data):,} rows changed since the last load; "
+                        "the next run enriches only their new entities"
+                    )
             return data
-    return None
\ No newline at end of file
+    return None
+
+
+def show_sheet_write_back(results):
+    """Button that writes the enriched columns of `results` back to the connected sheet."""
+    url = st.session_state.get('sheet_url')
+    if not url or results is None or not len(results):
+        return
+    sync = get_sheet_sync()
+    if not sync.backend.writable:
+        st.caption("Add a service account to the gsheets connection secrets to write results back to the sheet")
+        return
+    if not st.button("Write results to Google Sheet", key=f"write_back_{id(results)}"):
+        return
+
+    source_columns = set(results.entity_index.df.columns) if results.entity_index is not None else set()
+    columns = {}
+    for column in results.columns:
+        if column in source_columns:
+            continue
+        # A result whose name clashes with a sheet column was stored as "<name>_enriched"; update the original
+        target = column[:-len("_enriched")] if column.endswith("_enriched") else column
+        columns[column] = target if column.endswith("_enriched") and target in source_columns else column
+    try:
+        with st.spinner("Writing to Google Sheets..."):
+            rows, ranges = sync.write_back(url, results.to_frame(), sorted(results.row_ids), columns)
+    except Exception as e:
+        st.error(f"Writing to Google Sheets failed: {str(e)}")
+        return
+    if rows or ranges:
+        st.success(f"Updated {rows:,} rows in one request ({ranges} ranges)")
+    else:
+        st.info("The sheet is already up to date")
@@ -0,0 +1,45 @@
+import streamlit as st
+from services.csv_handler import display_results
+from services.jobs import DONE, FAILED, CANCELLED
+
+
+STATUS_ICONS = {"queued": "⏳", "running": "🔄", DONE: "✅", FAILED: "❌", CANCELLED: "🚫"}
+
+
+def _show_job(manager, job):
+    with st.expander(f"{STATUS_ICONS.get(job.status, '')} {job.label} · {job.status} · {job.elapsed:.0f}s",
+                     expanded=job.active or job.status == DONE):
+        reporter = job.reporter
+        if job.active:
+            st.progress(reporter.fraction, reporter.text or "Waiting for a worker...")
+            if st.button("Cancel", key=f"cancel_{job.id}"):
+                manager.cancel(job.id)
+                st.rerun()
+        for level, message in list(reporter.messages)[-5:]:
+            getattr(st, level if level in ("info", "success", "warning", "error") else "info")(message)
+        if job.status == FAILED and job.error:
+            st.error(f"Job failed: {job.error}")
+        if job.results is not None:
+            if job.status == DONE:
+                display_results(job.results, key=job.id)
+            elif len(job.results):
+                st.dataframe(job.results.to_frame(), use_container_width=True)
+
+
+def show_jobs_panel(manager, owner):
+    """List the session's background jobs, polling while any of them is still running."""
+    jobs = manager.jobs(owner)
+    if not jobs:
+        return
+    was_active = any(job.active for job in jobs)
+
+    @st.fragment(run_every=2 if was_active else None)
+    def render():
+        st.markdown("### Jobs")
+        current = manager.jobs(owner)
+        for job in current:
+            _show_job(manager, job)
+        if was_active and not any(job.active for job in current):
+            st.rerun()  # Full rerun to stop polling and refresh the rest of the page
+
+    render()
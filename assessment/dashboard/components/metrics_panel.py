@@ -0,0 +1,55 @@
+import pandas as pd
+import streamlit as st
+
+
+def _labels(labels):
+    return ", ".join(f"{key}={value}" for key, value in labels.items())
+
+
+def show_metrics_panel(registry):
+    """Collapsible view of the process-wide metrics with JSON / Prometheus exports."""
+    snapshot = registry.snapshot()
+    with st.expander("Metrics", expanded=False):
+        phases = [h for h in snapshot["histograms"] if h["name"] == "phase_seconds"]
+        if phases:
+            st.markdown("**Time per phase**")
+            st.dataframe(pd.DataFrame([
+                {"phase": h["labels"].get("phase"), "runs": h["count"], "total (s)": round(h["sum"], 2)}
+                for h in phases
+            ]), use_container_width=True, hide_index=True)
+
+        if snapshot["histograms"]:
+            st.markdown("**Latencies**")
+            st.dataframe(pd.DataFrame([
+                {
+                    "span": h["name"].replace("_seconds", ""),
+                    "labels": _labels(h["labels"]),
+                    "count": h["count"],
+                    "mean (s)": round(h["sum"] / h["count"], 3) if h["count"] else 0.0,
+                    "p50 ≤ (s)": h["p50"],
+                    "p95 ≤ (s)": h["p95"],
+                    "total (s)": round(h["sum"], 2),
+                }
+                for h in snapshot["histograms"]
+            ]), use_container_width=True, hide_index=True)
+
+        if snapshot["counters"]:
+            st.markdown("**Counters**")
+            st.dataframe(pd.DataFrame([
+                {"counter": c["name"], "labels": _labels(c["labels"]), "value": round(c["value"], 2)}
+                for c in snapshot["counters"]
+            ]), use_container_width=True, hide_index=True)
+
+        if not snapshot["histograms"] and not snapshot["counters"]:
+            st.caption("No metrics recorded yet.")
+
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.download_button("Export JSON", registry.to_json(), file_name="metrics.json", mime="application/json")
+        with col2:
+            st.download_button("Export Prometheus", registry.to_prometheus(), file_name="metrics.prom",
+                               mime="text/plain")
+        with col3:
+            if st.button("Reset metrics"):
+                registry.reset()
+                st.rerun()
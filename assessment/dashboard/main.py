@@ -4,56 +4,118 @@ from components.header import display_header
 from components.data_loader import (
     show_data_source_selector,
     handle_file_upload,
-    handle_gsheets_connection
+    handle_gsheets_connection,
+    load_selected_columns,
+    data_fingerprint,
+    show_sheet_write_back
 )
 from components.data_display import (
     show_metrics,
     show_column_selector,
     display_dataframe,
     show_query_input,
+    show_normalization_options,
     show_welcome_message
 )
-from services.csv_handler import generate_csv, display_csv_file
+from components.metrics_panel import show_metrics_panel
+from components.jobs_panel import show_jobs_panel
+from services.result_store import ResultTable, output_path_for
 
-from utils.state_management import initialize_session_state
-import os
+from utils.state_management import initialize_session_state, session_cached
 from dotenv import load_dotenv
-from langchain_groq import ChatGroq
-from langchain_core.prompts import ChatPromptTemplate
-from services.data_processor import (
-    extract_unique_selected_columns_data,
-    process_search_queries,
-    process_queries_with_delay,
-    final_processing,
-    behaviour_control
-)
-from services.llm_service import setup_agent_executor
-import json
+from services.entity_index import NORMALIZATIONS
+from services.data_processor import build_entity_index
+from services.enrichment import run_enrichment
+from services.jobs import JobManager, JobQueueFull, DONE
+from services.progress import StreamlitReporter
+from services.llm_service import setup_agent_executor, run_search, get_search_query_prompt
+from services.cache_store import SQLiteCache, cache_path
+from services.llm_cache import CachedLLM
+from services.search_cache import SearchCache
+from services.checkpoint import CheckpointStore, JobCheckpoint, make_job_id, make_job_key
+from services.answer_store import AnswerStore, JobAnswers, STALENESS_POLICIES
+from services.extractors import FastPathExtractor
+from services.llm_pool import LLMPool, discover_api_keys
+from services.scheduler import AdaptiveScheduler, Cancelled
+from services.metrics import registry
+
+
+# Streamlit re-executes main() on every interaction; everything below is built
+# once per process and shared by all sessions. Restart the app after editing .env.
+@st.cache_resource(show_spinner=False)
+def get_llm_resources():
+    """One pool over every GROQ_API_KEY* shared by all phases, behind the response cache."""
+    api_keys = discover_api_keys()
+    llm_pool = LLMPool.from_env(model_name="mixtral-8x7b-32768", temperature=0.0) if api_keys else None
+    llm_cache = SQLiteCache(cache_path("llm_responses.sqlite"))
+    return api_keys, llm_pool, llm_cache, CachedLLM(llm_pool, llm_cache)
+
+
+@st.cache_resource(show_spinner=False)
+def get_search_cache():
+    """Overlapping search queries across entities are served from memory or disk."""
+    return SearchCache(
+        ttl=24 * 3600,
+        disk_cache=SQLiteCache(cache_path("search_results.sqlite"), max_age=24 * 3600, max_bytes=64 * 1024 * 1024)
+    )
+
+
+@st.cache_resource(show_spinner=False)
+def get_prompt():
+    return get_search_query_prompt()
+
+
+@st.cache_resource(show_spinner=False)
+def get_checkpoint_store():
+    return CheckpointStore(cache_path("checkpoints.sqlite"))
+
+
+@st.cache_resource(show_spinner=False)
+def get_answer_store():
+    """Final answers of every job, reused when the same question is asked again."""
+    return AnswerStore(cache_path("answers.sqlite"))
+
+
+@st.cache_resource(show_spinner=False)
+def get_job_manager():
+    """Background jobs of every session: two run at a time, up to eight wait."""
+    return JobManager(max_workers=2, max_queued=8)
+
+
+@st.cache_resource(show_spinner=False)
+def get_agent_executor(_llm, _search_cache):
+    """The agent holds no per-job state, so one executor serves every run."""
+    return setup_agent_executor(_llm, search_cache=_search_cache)
+
+
+def prepare_job(entity_index, selected_columns, query, normalizations, job_id, max_age, refresh, model):
+    """Give a job its own records, load its checkpoint and look up its stored answers.
 
+    Returns (entity index, checkpoint, answers, stored, resumed).
+    """
+    entity_index = entity_index.fork()
+    entities = entity_index.records
+    # Record every stage result so a rerun of the same job resumes where it stopped
+    checkpoint = JobCheckpoint(get_checkpoint_store(), job_id, selected_columns)
+    answers = JobAnswers(
+        get_answer_store(), selected_columns, query, normalizations,
+        max_age=max_age, refresh=refresh, job_id=job_id, model=model
+    )
+    stored = answers.prefetch(entities)
+    # Stale answers must not come straight back from the checkpoint either
+    checkpoint.discard(entities if refresh else answers.stale)
+    return entity_index, checkpoint, answers, stored, checkpoint.completed(entities)
 
 
 def main():
     # Load environment variables and initialize LLM components first
     load_dotenv()
     
-    # Initialize LLM
-    llm = ChatGroq(model_name="mixtral-8x7b-32768",
-                   temperature=0.0,
-                   api_key=os.environ.get("GROQ_API_KEY_1"))
-    llm2 = ChatGroq(model_name="mixtral-8x7b-32768",
-                   temperature=0.0,
-                   api_key=os.environ.get("GROQ_API_KEY_2"))
-
-    # Initialize search query prompt template
-    search_query_prompt = ChatPromptTemplate.from_messages([
-        ("system", "You are an assistant that generates highly relevant search queries to retrieve information"),
-        ("human", "Based on the user's query and the provided data, generate up to 2 of the most effective search queries that would likely yield relevant results."),
-        ("human", "User's query: {user_query}"),
-        ("human", "Data from selected columns: {selected_columns_data}"),
-        ("human", "Return the two best queries as a list."),
-        ("human", "If the data is not relevant to the user's query or if data is ambiguous or if you have even 5 percent of doubt, return an empty list."),
-        ("human", "use the relevant data from selected columns to generate the queries.")
-    ])
+    api_keys, llm_pool, llm_cache, llm = get_llm_resources()
+    llm2 = llm
+    search_cache = get_search_cache()
+    search_query_prompt = get_prompt()
+    job_manager = get_job_manager()
 
     # Page configuration
     st.set_page_config(layout="wide", page_title="Inventory Dashboard")
@@ -69,6 +131,33 @@ def main():
     
     # Show data source selector
     data_source = show_data_source_selector()
+    stream_results = st.sidebar.toggle(
+        "Stream results",
+        value=True,
+        help="Process each entity end to end and show results as they finish"
+    )
+    run_in_background = st.sidebar.toggle(
+        "Run in background",
+        value=True,
+        help="Run jobs in a worker thread so the page stays responsive; results stay available for this session"
+    )
+    search_mode = st.sidebar.radio(
+        "Search mode",
+        ["Agent", "Direct"],
+        help="Agent: an LLM agent drives each search. Direct: raw search results go straight to extraction (one LLM call per entity)"
+    )
+    reuse_policy = st.sidebar.selectbox(
+        "Reuse answers younger than",
+        list(STALENESS_POLICIES),
+        index=1,
+        help="Entities answered for the same question within this time are not looked up again. "
+             "Answers that found nothing are retried after a day"
+    )
+    force_refresh = st.sidebar.toggle(
+        "Force refresh",
+        value=False,
+        help="Ignore stored answers and checkpoints and look every entity up again"
+    )
     
     # Handle data loading
     if data_source == "Upload File":
@@ -88,41 +177,146 @@ def main():
         
         
         if selected_columns:
-            selected_columns_data = extract_unique_selected_columns_data(df, selected_columns)
-            st.write(f"Selected columns data length: {len(selected_columns_data)}")
+            df = load_selected_columns(df, selected_columns)
+            if df is None:
+                st.stop()
+            normalizations = show_normalization_options(NORMALIZATIONS)
+            fingerprint = data_fingerprint(df, selected_columns)
+            # Kept across reruns; jobs work on their own fork of it
+            entity_index = session_cached(
+                "entity_index", (fingerprint, tuple(selected_columns), tuple(normalizations)),
+                lambda: build_entity_index(df, selected_columns, normalizations)
+            )
+            selected_columns_data = entity_index.records
+            st.write(f"Selected columns data length: {len(selected_columns_data)} (from {len(df):,} rows)")
             
             if selected_columns_data:
                 query = show_query_input(selected_columns)
                 
-                # Only proceed with processing if query is not None (Enter was pressed)
+                if query and llm_pool is None:
+                    st.error("No API keys found. Set GROQ_API_KEY_1, GROQ_API_KEY_2, ... in your .env file")
+                    st.stop()
+
+                checkpoint = None
+                answers = None
+                job_key = None
+                output_path = None
+                # Mechanical answers (e.g. population figures) skip the llm2 call
+                fast_path = FastPathExtractor()
+                # One pacer for every call of the job, starting at ~0.5 requests/s per key
+                scheduler = AdaptiveScheduler(rate=0.5 * max(1, len(api_keys)))
                 if query:
-                    # Phase 1: Generate search queries
-                    with st.spinner("Generating search queries..."):
-                        if not process_search_queries(selected_columns_data, llm, search_query_prompt, query):
-                            st.stop()
-                    
-                    # Phase 2: Setup agent executor
-                    st.divider()
+                    job_id = make_job_id(selected_columns, query, llm.model_name)
+                    # Checkpoints are shared by any data with the same question; jobs and their
+                    # results belong to this exact data
+                    job_key = make_job_key(job_id, fingerprint + (":refresh" if force_refresh else ""), normalizations)
+                    # Resolved here: background jobs run on a worker thread without session state
+                    output_path = output_path_for(st.session_state.session_id, job_key)
+                    # Loaded once per job; reruns of the page reuse it
+                    entity_index, checkpoint, answers, stored, resumed = session_cached(
+                        "job_setup", (job_key, reuse_policy),
+                        lambda: prepare_job(
+                            entity_index, selected_columns, query, normalizations, job_id,
+                            STALENESS_POLICIES[reuse_policy], force_refresh, llm.model_name
+                        )
+                    )
+                    if stored:
+                        st.info(f"{stored} of {len(selected_columns_data)} entities already have a fresh answer "
+                                "to this question; reusing them")
+                    if resumed:
+                        st.info(f"Resuming job: {resumed} of {len(selected_columns_data)} entities already completed")
+                    selected_columns_data = entity_index.records
+
+                if force_refresh:
+                    # Look everything up again; fresh answers still refill the caches
+                    llm = llm2 = llm.refreshing()
+
+                # Only proceed with processing if query is not None (Enter was pressed)
+                def search_fn(search_query):
+                    return run_search(search_query, search_cache, refresh=force_refresh)
+
+                agent_executor = None
+                if query and search_mode == "Agent":
                     with st.spinner("Setting up agent..."):
-                        agent_executor = setup_agent_executor(llm)
+                        if force_refresh:
+                            agent_executor = setup_agent_executor(llm, search_cache=search_cache, refresh=True)
+                        else:
+                            agent_executor = get_agent_executor(llm, search_cache)
+                            if not agent_executor:
+                                get_agent_executor.clear()  # Don't keep the failure cached
                         if not agent_executor:
                             st.stop()
-                        
-                    for entity in selected_columns_data:
-                        print(entity)
-                    # Phase 3: Process entities
-                    with st.spinner("Processing search results..."):
-                        st.write("Agent executor created")
-                        process_queries_with_delay(selected_columns_data, agent_executor, delay_range=(1, 3))
-                    
-                    st.divider()
-                    # Save selected_columns_data to a file
-                    with open('selected_columns_data.json', 'w') as f:
-                        json.dump(selected_columns_data, f, indent=4)
-                    # Phase 4: Final processing and CSV generation
-                    with st.spinner("Generating final results..."):
-                        if not final_processing(selected_columns_data, llm2, behaviour_control):
+
+                def new_results():
+                    # Created per run: a new ResultTable starts its output file afresh
+                    return ResultTable(output_path, entity_index=entity_index)
+
+                def enrich(reporter, results, cancel_event=None):
+                    scheduler.cancel_event = cancel_event
+
+                    def job_search_fn(search_query):
+                        if cancel_event is not None and cancel_event.is_set():
+                            raise Cancelled("Job cancelled")
+                        return search_fn(search_query)
+
+                    # A rerun of the job starts from its checkpoint, not from the last run's leftovers
+                    selected_columns_data.clear_results()
+                    return run_enrichment(
+                        selected_columns_data, query, llm, search_query_prompt, results, reporter=reporter,
+                        mode=search_mode.lower(), streaming=stream_results, agent_executor=agent_executor,
+                        search_fn=job_search_fn, checkpoint=checkpoint, fast_path=fast_path,
+                        scheduler=scheduler, llm2=llm2, answers=answers
+                    )
+
+                finished = None
+                if query and run_in_background:
+                    job = job_manager.find(st.session_state.session_id, job_key)
+                    if job is not None and job.status == DONE:
+                        finished = job.results
+                    if job is None or (not job.active and st.button("Run again")):
+                        try:
+                            job_manager.submit(
+                                lambda job: enrich(job.reporter, new_results(), job.cancel_event),
+                                owner=st.session_state.session_id,
+                                key=job_key,
+                                label=f"{query} ({len(selected_columns_data):,} entities)"
+                            )
+                        except JobQueueFull as e:
+                            st.error(str(e))
+                elif query:
+                    finished = new_results()
+                    with st.spinner("Processing entities..."):
+                        if not enrich(StreamlitReporter(), finished):
                             st.stop()
+
+                if data_source == "Google Sheets":
+                    show_sheet_write_back(finished)
+
+                if query:
+                    cache_stats = llm_cache.stats()
+                    search_stats = search_cache.stats()
+                    st.caption(
+                        f"LLM cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses "
+                        f"({cache_stats['entries']} cached responses) · "
+                        f"Search cache: {search_stats['hits']} hits, {search_stats['misses']} misses · "
+                        f"Stored answers: {get_answer_store().stats()['entries']:,}"
+                    )
+                    if not run_in_background:
+                        # These belong to the run that just finished in this script run
+                        fast_path_stats = fast_path.stats()
+                        scheduler_stats = scheduler.stats()
+                        st.caption(
+                            f"Fast-path extraction: {fast_path_stats['skipped']}/{fast_path_stats['attempts']} "
+                            f"LLM calls skipped ({fast_path_stats['skip_rate']:.0%}) · "
+                            f"Paced at {scheduler_stats['rate']:.2f} req/s, "
+                            f"{scheduler_stats['slept']:.1f}s spent waiting, "
+                            f"{scheduler_stats['rate_limits']} throttles"
+                        )
+                    st.caption(" · ".join(
+                        f"{key['key']}: {key['calls']} calls, {key['rate_limited']} rate limited"
+                        for key in llm_pool.stats()
+                    ))
+                    show_metrics_panel(registry)
             else:
                 st.warning("No data to process from selected columns")
         else:
@@ -130,6 +324,8 @@ def main():
     else:
         show_welcome_message()
 
+    show_jobs_panel(job_manager, st.session_state.session_id)
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,32 @@
+from langchain_core.prompts import ChatPromptTemplate
+
+
+# Vendored copy of the "hwchase17/xml-agent-convo" hub prompt, so agent setup
+# needs no network round-trip. The agent keeps no conversation history.
+XML_AGENT_TEMPLATE = """You are a helpful assistant. Help the user answer any questions.
+
+You have access to the following tools:
+
+{tools}
+
+In order to use a tool, you can use <tool></tool> and <tool_input></tool_input> tags. You will then get back a response in the form <observation></observation>
+For example, if you have a tool called 'search' that could run a google search, in order to search for the weather in SF you would respond:
+
+<tool>search</tool><tool_input>weather in SF</tool_input>
+<observation>64 degrees</observation>
+
+When you are done, respond with a final answer between <final_answer></final_answer>. For example:
+
+<final_answer>The weather in SF is 64 degrees</final_answer>
+
+Begin!
+
+Previous Conversation:
+{chat_history}
+
+Question: {input}
+{agent_scratchpad}"""
+
+
+def get_xml_agent_prompt():
+    return ChatPromptTemplate.from_messages([("human", XML_AGENT_TEMPLATE)]).partial(chat_history="")
@@ -0,0 +1,171 @@
+import json
+import sqlite3
+import threading
+import time
+import pandas as pd
+from .entity_index import NORMALIZATIONS, normalize_series
+from .metrics import registry
+from .search_cache import normalize_query
+
+
+# Staleness policy label -> how long a stored answer is reused, in seconds (None: forever)
+STALENESS_POLICIES = {
+    "1 day": 24 * 3600,
+    "7 days": 7 * 24 * 3600,
+    "30 days": 30 * 24 * 3600,
+    "Never expire": None,
+}
+# Answers that found nothing are retried sooner, whatever the policy
+MISSING_MAX_AGE = 24 * 3600
+MISSING_VALUES = frozenset({"", "n/a", "na", "none", "null", "unknown", "not found", "not available"})
+
+
+def is_missing(value):
+    return value is None or str(value).strip().strip(".").casefold() in MISSING_VALUES
+
+
+def entity_keys(entities, columns, normalizations=tuple(NORMALIZATIONS)):
+    """Normalized key tuple of every entity, as JSON text, using the same rules as EntityIndex."""
+    if not entities:
+        return []
+    frame = pd.DataFrame(entities, columns=list(columns))
+    normalized = [normalize_series(frame[column], normalizations).fillna("").tolist() for column in columns]
+    return [json.dumps(list(values), ensure_ascii=False) for values in zip(*normalized)]
+
+
+class AnswerStore:
+    """SQLite store of final [type, value] answers shared by every job and session.
+
+    Answers are keyed by the normalized query text, the selected columns
+    and the entity's normalized key tuple over them, so the same question
+    over an overlapping sheet finds them again while the same values under
+    other columns do not. Each row keeps where the answer came from and when.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS answers (
+                query TEXT NOT NULL,
+                columns TEXT NOT NULL,
+                entity_key TEXT NOT NULL,
+                answer_type TEXT NOT NULL,
+                value TEXT NOT NULL,
+                search_queries TEXT NOT NULL,
+                job_id TEXT NOT NULL,
+                model TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (query, columns, entity_key)
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS answers_created ON answers (created_at)")
+        self._conn.commit()
+
+    def lookup(self, query, keys, columns=(), chunk_size=500):
+        """Return {entity_key: row dict} for the stored answers of `keys` (over `columns`) to `query`."""
+        query = normalize_query(query)
+        columns = json.dumps(list(columns))
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        with self._lock:
+            for start in range(0, len(keys), chunk_size):
+                chunk = keys[start:start + chunk_size]
+                rows = self._conn.execute(
+                    "SELECT entity_key, answer_type, value, search_queries, job_id, model, created_at "
+                    "FROM answers WHERE query = ? AND columns = ? "
+                    f"AND entity_key IN ({', '.join('?' * len(chunk))})",
+                    [query, columns] + chunk
+                ).fetchall()
+                for key, answer_type, value, search_queries, job_id, model, created_at in rows:
+                    found[key] = {
+                        "type": answer_type,
+                        "value": json.loads(value),
+                        "columns": json.loads(columns),
+                        "search_queries": json.loads(search_queries),
+                        "job_id": job_id,
+                        "model": model,
+                        "created_at": created_at,
+                    }
+        return found
+
+    def save(self, query, key, answer, columns=(), search_queries=(), job_id="", model=""):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO answers (query, columns, entity_key, answer_type, value, search_queries, "
+                "job_id, model, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (normalize_query(query), json.dumps(list(columns)), key, str(answer[0]),
+                 json.dumps(answer[1], default=str), json.dumps(list(search_queries or []), default=str),
+                 job_id, model, time.time())
+            )
+            self._conn.commit()
+
+    def stats(self):
+        with self._lock:
+            entries, oldest = self._conn.execute("SELECT COUNT(*), MIN(created_at) FROM answers").fetchone()
+        return {"entries": entries, "oldest": oldest}
+
+
+class JobAnswers:
+    """Stored answers for one job's entities, looked up once before the job runs.
+
+    An answer is fresh while it is younger than `max_age` (and, if it found
+    nothing, younger than MISSING_MAX_AGE). With `refresh`, nothing counts
+    as fresh, but new answers are still saved.
+    """
+
+    def __init__(self, store, columns, query, normalizations=tuple(NORMALIZATIONS), max_age=None,
+                 refresh=False, job_id="", model=""):
+        self.store = store
+        self.columns = list(columns)
+        self.query = query
+        self.normalizations = normalizations
+        self.max_age = max_age
+        self.refresh = refresh
+        self.job_id = job_id
+        self.model = model
+        self._keys = {}  # id(entity) -> entity key
+        self._fresh = {}  # id(entity) -> stored row
+        self.stale = []  # entities whose stored answer is too old
+
+    def prefetch(self, entities):
+        """Look up every entity; returns the number with a fresh answer."""
+        keys = entity_keys(entities, self.columns, self.normalizations)
+        self._keys = {id(entity): key for entity, key in zip(entities, keys)}
+        stored = self.store.lookup(self.query, keys, self.columns)
+        now = time.time()
+        self._fresh, self.stale = {}, []
+        for entity, key in zip(entities, keys):
+            row = stored.get(key)
+            if row is None:
+                registry.inc("answer_store_total", result="miss")
+            elif not self.refresh and self._is_fresh(row, now):
+                registry.inc("answer_store_total", result="fresh")
+                self._fresh[id(entity)] = row
+            else:
+                registry.inc("answer_store_total", result="stale")
+                self.stale.append(entity)
+        return len(self._fresh)
+
+    def _is_fresh(self, row, now):
+        age = now - row["created_at"]
+        if self.max_age is not None and age > self.max_age:
+            return False
+        return not (is_missing(row["value"]) and age > MISSING_MAX_AGE)
+
+    def restore(self, entity):
+        """Apply a fresh stored answer to `entity`; returns False if there is none."""
+        row = self._fresh.get(id(entity))
+        if row is None:
+            return False
+        entity[row["type"]] = row["value"]
+        return True
+
+    def save(self, entity, answer):
+        key = self._keys.get(id(entity))
+        if key is None:
+            key = entity_keys([entity], self.columns, self.normalizations)[0]
+        self.store.save(self.query, key, answer, self.columns, entity.get('search_queries'),
+                        self.job_id, self.model)
@@ -0,0 +1,113 @@
+import os
+import sqlite3
+import threading
+import time
+
+
+DEFAULT_CACHE_DIR = os.environ.get("DASHBOARD_CACHE_DIR", ".cache")
+
+
+def cache_path(filename):
+    """Return a path inside the dashboard cache directory, creating it if needed."""
+    os.makedirs(DEFAULT_CACHE_DIR, exist_ok=True)
+    return os.path.join(DEFAULT_CACHE_DIR, filename)
+
+
+class SQLiteCache:
+    """Persistent key/value cache with age- and size-based eviction.
+
+    Values are stored as text. Entries older than `max_age` seconds are treated
+    as misses and removed; once the stored payload exceeds `max_bytes` the least
+    recently used entries are dropped first.
+    """
+
+    def __init__(self, path, max_age=7 * 24 * 3600, max_bytes=256 * 1024 * 1024):
+        self.path = path
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed_at)")
+        self._conn.commit()
+
+    def get(self, key):
+        """Return the cached value for `key`, or None on a miss."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or (self.max_age and now - row[1] > self.max_age):
+                if row is not None:
+                    self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                    self._conn.commit()
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE cache SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def set(self, key, value):
+        """Store `value` under `key` and evict entries that are too old or over budget."""
+        now = time.time()
+        size = len(value.encode("utf-8"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, value, size, now, now)
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def delete(self, key):
+        with self._lock:
+            self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def _evict(self, now):
+        if self.max_age:
+            self._conn.execute("DELETE FROM cache WHERE created_at < ?", (now - self.max_age,))
+        if self.max_bytes:
+            total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM cache").fetchone()[0]
+            if total > self.max_bytes:
+                excess = total - self.max_bytes
+                rows = self._conn.execute("SELECT key, size FROM cache ORDER BY accessed_at ASC")
+                stale = []
+                for key, size in rows:
+                    if excess <= 0:
+                        break
+                    stale.append((key,))
+                    excess -= size
+                self._conn.executemany("DELETE FROM cache WHERE key = ?", stale)
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM cache")
+            self._conn.commit()
+
+    def stats(self):
+        """Return hit/miss counters and the current size of the store."""
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
+            "bytes": size,
+        }
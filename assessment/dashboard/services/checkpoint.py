@@ -0,0 +1,118 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+
+# Stage name -> how its result is stored on / restored to an entity dict
+STAGE_QUERIES = 'queries'
+STAGE_SEARCH = 'search'
+STAGE_EXTRACT = 'extract'
+
+
+def make_job_id(selected_columns, query, model_name=""):
+    """Identify a job by what it asks, so re-running the same question resumes it."""
+    payload = json.dumps([list(selected_columns), query.strip(), model_name])
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def make_job_key(job_id, data_fingerprint, normalizations=()):
+    """Identify one run of a job over specific data, e.g. to find its background job again."""
+    payload = json.dumps([job_id, data_fingerprint, sorted(normalizations)])
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def entity_key(entity, columns):
+    """Stable key for an entity built from its selected column values only."""
+    payload = json.dumps([str(entity.get(column)) for column in columns])
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+class CheckpointStore:
+    """Append-only SQLite log of per-entity stage results."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        # CLI shards write to the same file from separate processes, so wait on locks
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS checkpoints (
+                job_id TEXT NOT NULL,
+                entity_key TEXT NOT NULL,
+                stage TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (job_id, entity_key, stage)
+            )
+        """)
+        self._conn.commit()
+
+    def load(self, job_id):
+        """Return {entity_key: {stage: result}} for everything recorded under `job_id`."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT entity_key, stage, payload FROM checkpoints WHERE job_id = ?", (job_id,)
+            ).fetchall()
+        results = {}
+        for key, stage, payload in rows:
+            results.setdefault(key, {})[stage] = json.loads(payload)
+        return results
+
+    def save(self, job_id, key, stage, result):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO checkpoints (job_id, entity_key, stage, payload, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (job_id, key, stage, json.dumps(result, default=str), time.time())
+            )
+            self._conn.commit()
+
+    def clear(self, job_id):
+        with self._lock:
+            self._conn.execute("DELETE FROM checkpoints WHERE job_id = ?", (job_id,))
+            self._conn.commit()
+
+
+class JobCheckpoint:
+    """Checkpoints of one job, preloaded so lookups during processing are free."""
+
+    def __init__(self, store, job_id, columns):
+        self.store = store
+        self.job_id = job_id
+        self.columns = list(columns)
+        self._results = store.load(job_id)
+
+    def completed(self, entities, stage=STAGE_EXTRACT):
+        """Number of `entities` that already have a result for `stage`."""
+        return sum(1 for entity in entities if stage in self._results.get(entity_key(entity, self.columns), {}))
+
+    def discard(self, entities):
+        """Forget the recorded results of `entities` so this run computes them again."""
+        for entity in entities:
+            self._results.pop(entity_key(entity, self.columns), None)
+
+    def restore(self, entity, stage):
+        """Apply a recorded stage result to `entity`; returns False if there is none."""
+        stored = self._results.get(entity_key(entity, self.columns), {})
+        if stage not in stored:
+            return False
+        result = stored[stage]
+        if stage == STAGE_QUERIES:
+            entity['search_queries'] = result
+        elif stage == STAGE_SEARCH:
+            entity['one_value'] = result
+        elif stage == STAGE_EXTRACT:
+            entity[result[0]] = result[1]
+        return True
+
+    def save(self, entity, stage, result=None):
+        """Record a finished stage for `entity`. `result` is required for the extract stage."""
+        if stage == STAGE_QUERIES:
+            result = entity.get('search_queries', [])
+        elif stage == STAGE_SEARCH:
+            result = entity.get('one_value', [])
+        key = entity_key(entity, self.columns)
+        self._results.setdefault(key, {})[stage] = result
+        self.store.save(self.job_id, key, stage, result)
@@ -1,32 +1,40 @@
-import pandas as pd
 import streamlit as st
 import csv
+from .result_store import PROCESSING_KEYS, format_row
+
+# Download label -> (file extension, MIME type)
+DOWNLOAD_FORMATS = {
+    "CSV": ("csv", "text/csv"),
+    "Parquet": ("parquet", "application/vnd.apache.parquet"),
+    "Excel": ("xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+}
+
 
 def generate_csv(selected_columns_data):
     """Generate CSV file from processed data."""
-    columns = [key for key in selected_columns_data[0].keys() 
-              if key not in ['search_queries', 'one_value']]
-    
+    columns = [key for key in selected_columns_data[0].keys()
+              if key not in PROCESSING_KEYS]
+
     with open('output.csv', mode='w', newline='') as file:
         writer = csv.DictWriter(file, fieldnames=columns)
         writer.writeheader()
         for dict_element in selected_columns_data:
-            data_for_csv = {
-                key: (', '.join(str(v) for v in value) if isinstance(value, list) else value) 
-                for key, value in dict_element.items() 
-                if key not in ['search_queries', 'one_value']
-            }
-            writer.writerow(data_for_csv)
+            writer.writerow(format_row(dict_element))
+
+
+def display_results(results, key=None):
+    """Preview a ResultTable and offer it for download straight from memory.
 
-def display_csv_file(file_path):
-    """Display the generated CSV file as a downloadable link and preview."""
-    with open(file_path, 'rb') as file:
-        st.download_button(
-            label="Download CSV",
-            data=file,
-            file_name="output.csv",
-            mime="text/csv"
-        )
-    # Show preview of the CSV
-    df = pd.read_csv(file_path)
-    st.dataframe(df)
+    `key` keeps the widgets apart when several result tables are on one page.
+    """
+    fmt = st.radio("Download format", list(DOWNLOAD_FORMATS), horizontal=True,
+                   key=f"format_{key}" if key else None)
+    extension, mime = DOWNLOAD_FORMATS[fmt]
+    st.download_button(
+        label=f"Download {fmt}",
+        data=results.to_bytes(fmt),
+        file_name=f"output.{extension}",
+        mime=mime,
+        key=f"download_{key}" if key else None
+    )
+    st.dataframe(results.to_frame())
@@ -1,13 +1,20 @@
-import streamlit as st
 import ast
 import time
-import random
-from .csv_handler import display_csv_file 
-import os
-import groq
-import csv
-from langchain.prompts import ChatPromptTemplate
+from .progress import StreamlitReporter
+from .result_store import ResultTable
+from .pipeline import run_streaming_pipeline
+from .checkpoint import STAGE_QUERIES, STAGE_SEARCH, STAGE_EXTRACT
+from .entity_index import EntityIndex, NORMALIZATIONS
+from langchain_core.prompts import ChatPromptTemplate
 import logging
+import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from .scheduler import AdaptiveScheduler
+from .llm_pool import is_rate_limit_error
+from .llm_cache import CachedLLM
+from .metrics import registry
+from .query_planner import plan_queries
+from .evidence import DEFAULT_TOKEN_BUDGET, compact_evidence, count_tokens
 
 behaviour_control = ChatPromptTemplate.from_messages([
     ("system", """You are a precise data extraction assistant. You must:
@@ -56,223 +63,582 @@ behaviour_control = ChatPromptTemplate.from_messages([
     ("human", """If Search queries is 'Population of Buckinghamshire County in current year' and one_value is 'The population of Buckinghamshire County is around 555,300-560,400, with a higher female population and a higher proportion of 5 to 14 year olds compared to the England average. The population has been increasing over the years.' then return ["Population", "558300"] - note this is exactly 2 entries. When the query and results are about population data, do not add irrelevant types like 'City' - always use 'Population' as the type. so always ceck the context of the query""")
 ])
 
+batch_search_query_prompt = ChatPromptTemplate.from_messages([
+    ("system", "You are an assistant that generates highly relevant search queries to retrieve information"),
+    ("human", "Based on the user's query and the provided data, generate up to 2 of the most effective search queries for EACH entity that would likely yield relevant results."),
+    ("human", "User's query: {user_query}"),
+    ("human", "Entities, as a JSON object keyed by row index: {entities}"),
+    ("human", "use the relevant data from each entity to generate its queries."),
+    ("human", "If the data of an entity is not relevant to the user's query or if it is ambiguous or if you have even 5 percent of doubt, use an empty list for that entity."),
+    ("human", """Return ONLY a JSON object that maps every row index (as a string) to a list of its queries, nothing else.
+    Example output: {{"0": ["Population of Kent County", "Kent County population 2024"], "1": []}}""")
+])
+
+
+def build_entity_index(df, selected_columns, normalizations=tuple(NORMALIZATIONS)):
+    """Index the unique normalized combinations of selected columns."""
+    if not selected_columns:
+        return None
+    return EntityIndex(df, selected_columns, normalizations)
 
-def extract_unique_selected_columns_data(df, selected_columns):
+
+def extract_unique_selected_columns_data(df, selected_columns, normalizations=tuple(NORMALIZATIONS)):
     """Extract unique combinations of selected columns."""
     if not selected_columns: 
         return None
         
-    data = df
-    selected_data = data[selected_columns].drop_duplicates().to_dict(orient='records')
-    return selected_data
+    return build_entity_index(df, selected_columns, normalizations).records
+
+def discard_response(llm, prompt):
+    """Keep a rejected reply out of the response cache so retries and reruns ask again."""
+    if hasattr(llm, "discard"):
+        llm.discard(prompt)
+
+
+def invoke_paced(llm, prompt, scheduler):
+    """Invoke `llm` under `scheduler`; replies served from the response cache are neither paced nor counted."""
+    called = []
+
+    def pace():
+        scheduler.acquire()
+        called.append(True)
+
+    if isinstance(llm, CachedLLM):
+        response = llm.invoke(prompt, before_call=pace)
+    else:
+        pace()
+        response = llm.invoke(prompt)
+    if called:
+        scheduler.on_success()
+    return response
 
-def process_search_queries(selected_columns_data, llm, search_query_prompt, query):
-    """First phase: Generate search queries for each entity."""
-    if not selected_columns_data:
-        st.error("No data to process")
-        return False
-    # Add progress bar
-    progress_bar = st.progress(0)
-    total_items = len(selected_columns_data)
 
-    for i, entity_data in enumerate(selected_columns_data):
-        # Update progress bar
-        progress = (i + 1) / total_items
-        progress_bar.progress(progress, f"Processing {i+1} of {total_items} entities")
+@registry.span("entity", phase="queries")
+def generate_entity_queries(entity_data, llm, search_query_prompt, query, scheduler=None, max_retries=3, label=""):
+    """Generate search queries for a single entity, retrying when the LLM returns an empty list."""
+    scheduler = scheduler or AdaptiveScheduler()
+    retry_count = 0  # Number of retries for empty search_queries
+    rate_limit_attempts = 0
 
-        max_retries = 3  # Maximum number of retries for empty search_queries
-        retry_count = 0
+    while retry_count < max_retries:  # Keep trying until successful or max retries reached
+        try:
+            # Generate the prompt
+            prompt = search_query_prompt.format(
+                user_query=query,
+                selected_columns_data=entity_data
+            )
+
+            # Invoke the LLM, waiting for a slot in the shared request budget unless the reply is cached
+            search_query = invoke_paced(llm, prompt, scheduler).content
+            rate_limit_attempts = 0
 
-        while retry_count < max_retries:  # Keep trying until successful or max retries reached
             try:
-                # Generate the prompt
-                prompt = search_query_prompt.format(
-                    user_query=query,
-                    selected_columns_data=entity_data
-                )
-                
-                # Invoke the LLM to get the response
-                search_query = llm.invoke(prompt).content
-
-                try:
-                    start_index = search_query.find('[')
-                    end_index = search_query.rfind(']')
-                    
-                    # Extract the substring and strip any leading/trailing whitespace
-                    queries_str = search_query[start_index:end_index+1].strip()
-                    
-                    # Convert the string into a Python list using eval() (since it should be a valid list format)
-                    if queries_str:
-                        queries_list = eval(queries_str)  # eval is safe here as the structure is predefined and controlled
-                        entity_data['search_queries'] = queries_list
-                        if queries_list:  # If we got valid queries, break the retry loop
-                            break
-                    else:
-                        entity_data['search_queries'] = []
-                except Exception as e:
-                    # If there's an error in parsing the list, set the search_queries to an empty list
-                    entity_data['search_queries'] = []
+                start_index = search_query.find('[')
+                end_index = search_query.rfind(']')
 
-                # If search_queries is empty, increment retry counter
-                if not entity_data.get('search_queries'):
-                    retry_count += 1
-                    logging.warning(f"Empty search queries for item {i+1}, attempt {retry_count}/{max_retries}")
-                    time.sleep(2)
-                    continue
-                
-                time.sleep(2)  # Base rate limiting
-                break  # Success, move to next entity
+                # Extract the substring and strip any leading/trailing whitespace
+                queries_str = search_query[start_index:end_index+1].strip()
 
-            except Exception as e:
-                if "rate_limit_exceeded" in str(e).lower():
-                    logging.warning(f"Rate limit reached at item {i+1}/{len(selected_columns_data)}. Waiting 3 seconds...")
-                    time.sleep(3)
-                    continue  # Retry the same entity
+                # Convert the string into a Python list using eval() (since it should be a valid list format)
+                if queries_str:
+                    queries_list = eval(queries_str)  # eval is safe here as the structure is predefined and controlled
+                    entity_data['search_queries'] = queries_list
+                    if queries_list:  # If we got valid queries, stop retrying
+                        return queries_list
                 else:
-                    logging.error(f"Error processing query at entity {i+1}: {e}")
                     entity_data['search_queries'] = []
-                    break  # Move to the next entity for non-rate-limit errors
-        if retry_count == max_retries:
-            logging.error(f"Failed to get valid search queries for item {i+1} after {max_retries} attempts")
-            # # Optionally show a less detailed message to the user
-            # st.warning("Some items could not be processed. Check the logs for details.")
+            except Exception as e:
+                # If there's an error in parsing the list, set the search_queries to an empty list
+                entity_data['search_queries'] = []
 
-    
-    st.success("Finished processing all entities.")
-    return True
+            # search_queries is empty, increment retry counter
+            discard_response(llm, prompt)
+            retry_count += 1
+            registry.inc("retries_total", phase="queries", reason="empty")
+            logging.warning(f"Empty search queries for item {label}, attempt {retry_count}/{max_retries}")
 
-def process_queries_with_delay(entities, agent_executor, delay_range=(0, 7), max_queries=3):
-    """Process queries with random delays between requests and limit per entity"""
-    
-    # Create progress bars
-    entity_progress = st.progress(0, "Overall Progress")
-    query_progress = st.empty()  # Placeholder for query progress text
-    total_entities = len(entities)
-    
+        except Exception as e:
+            if is_rate_limit_error(e):
+                rate_limit_attempts += 1
+                registry.inc("retries_total", phase="queries", reason="rate_limit")
+                delay = scheduler.on_rate_limit(e, rate_limit_attempts)
+                logging.warning(f"Rate limit reached at item {label}. Waiting {delay:.1f} seconds...")
+                continue  # Retry the same entity
+            else:
+                logging.error(f"Error processing query at entity {label}: {e}")
+                entity_data['search_queries'] = []
+                return []  # Move to the next entity for non-rate-limit errors
+
+    logging.error(f"Failed to get valid search queries for item {label} after {max_retries} attempts")
+    return entity_data.get('search_queries', [])
+
+
+def parse_batch_queries(response_text, expected_keys):
+    """Parse a batch response into {row index: queries}, keeping only well-formed entries."""
+    start_index = response_text.find('{')
+    end_index = response_text.rfind('}')
+    if start_index == -1 or end_index <= start_index:
+        return {}
     try:
-        for entity_idx, entity in enumerate(entities):
-            # Update entity progress
-            entity_progress.progress(
-                entity_idx / total_entities, 
-                f"Processing({entity_idx + 1}/{total_entities})"
+        parsed = json.loads(response_text[start_index:end_index+1])
+    except ValueError:
+        return {}
+    if not isinstance(parsed, dict):
+        return {}
+
+    valid = {}
+    for key in expected_keys:
+        queries = parsed.get(key)
+        if isinstance(queries, list) and queries and all(isinstance(q, str) and q.strip() for q in queries):
+            valid[key] = queries
+    return valid
+
+
+@registry.span("batch", phase="queries")
+def generate_batch_queries(batch, llm, search_query_prompt, query, scheduler=None, label="",
+                           max_rate_limit_retries=5):
+    """Generate search queries for several entities with one request.
+
+    A rate-limited batch waits for the scheduler and is sent again as a
+    whole. Entities whose entry is missing, malformed or empty in the
+    response fall back to `generate_entity_queries`, which keeps the
+    per-entity retry logic.
+    """
+    scheduler = scheduler or AdaptiveScheduler()
+    keys = [str(i) for i in range(len(batch))]
+    parsed = {}
+    rate_limit_attempts = 0
+    prompt = batch_search_query_prompt.format(
+        user_query=query,
+        entities=json.dumps({key: dict(entity_data) for key, entity_data in zip(keys, batch)}, default=str)
+    )
+    while True:
+        try:
+            parsed = parse_batch_queries(invoke_paced(llm, prompt, scheduler).content, keys)
+            if len(parsed) < len(batch):
+                discard_response(llm, prompt)
+        except Exception as e:
+            if is_rate_limit_error(e) and rate_limit_attempts < max_rate_limit_retries:
+                rate_limit_attempts += 1
+                registry.inc("retries_total", phase="queries", reason="rate_limit")
+                delay = scheduler.on_rate_limit(e, rate_limit_attempts)
+                logging.warning(f"Rate limit reached at batch {label}. Waiting {delay:.1f} seconds...")
+                continue  # Retry the whole batch
+            logging.warning(f"Batch query generation failed for items {label}: {e}")
+        break
+
+    for key, entity_data in zip(keys, batch):
+        if key in parsed:
+            entity_data['search_queries'] = parsed[key]
+        else:
+            generate_entity_queries(
+                entity_data, llm, search_query_prompt, query,
+                scheduler=scheduler, label=f"{label}#{key}"
             )
-            
-            entity['one_value'] = []
-            # Skip if search_queries is empty or None
-            if not entity.get('search_queries'):
-                continue
-                
-            # Limit the number of queries per entity
-            queries = entity['search_queries'][:max_queries]  # Take only first 3 queries
-            total_queries = len(queries)
-            
-            for query_idx, query in enumerate(queries):
-                try:
-                    # Update query progress
-                    query_text = query if isinstance(query, str) else " ".join(str(x) for x in query)
-                    query_progress.info(
-                        f"Searching ({query_idx + 1}/{total_queries}): {query_text[:50]}..."
-                    )
-                    
-                    result = agent_executor.invoke({"input": query})
-                    entity['one_value'].append(result['output'])
-                    time.sleep(random.uniform(*delay_range))
-                    
-                except Exception as e:
-                    st.warning(f"Error processing query for {entity.get('County', 'Unknown')}: {e}")
-                    entity['one_value'].append("Error")
-
-        # Show completion message
-        entity_progress.progress(1.0, "Processing Complete!")
+    if len(parsed) < len(batch):
+        registry.inc("batch_fallbacks_total", len(batch) - len(parsed))
+        logging.info(f"Batch {label}: {len(batch) - len(parsed)} of {len(batch)} entities fell back to single requests")
+    return len(batch)
+
+
+@registry.span("phase", phase="queries")
+def process_search_queries(selected_columns_data, llm, search_query_prompt, query,
+                           max_workers=4, requests_per_second=0.5, scheduler=None, batch_size=1,
+                           checkpoint=None, reporter=None):
+    """First phase: Generate search queries for each entity.
+
+    Entities are processed by a thread pool of `max_workers`; every worker draws
+    from one shared AdaptiveScheduler so the combined request rate follows
+    what the API allows (starting at `requests_per_second`), regardless of the
+    concurrency level. With
+    `batch_size` > 1, entities are packed into a single JSON-keyed request per
+    batch so the instruction messages are only sent once per batch.
+    Entities with checkpointed queries are restored instead of regenerated.
+    """
+    reporter = reporter or StreamlitReporter()
+    if not selected_columns_data:
+        reporter.error("No data to process")
+        return False
+    if scheduler is None:
+        scheduler = AdaptiveScheduler(requests_per_second)
+
+    total_items = len(selected_columns_data)
+    pending = [
+        entity_data for entity_data in selected_columns_data
+        if checkpoint is None or not checkpoint.restore(entity_data, STAGE_QUERIES)
+    ]
+    done = total_items - len(pending)
+
+    # Workers only touch their own entity dict; the reporter is updated
+    # from this thread as futures complete.
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        futures = {}
+        if batch_size > 1:
+            for start in range(0, len(pending), batch_size):
+                batch = pending[start:start + batch_size]
+                future = executor.submit(
+                    generate_batch_queries,
+                    batch, llm, search_query_prompt, query,
+                    scheduler=scheduler,
+                    label=f"{start+1}-{start + len(batch)}/{len(pending)}"
+                )
+                futures[future] = batch
+        else:
+            for i, entity_data in enumerate(pending):
+                future = executor.submit(
+                    generate_entity_queries,
+                    entity_data, llm, search_query_prompt, query,
+                    scheduler=scheduler,
+                    label=f"{i+1}/{len(pending)}"
+                )
+                futures[future] = [entity_data]
+        for future in as_completed(futures):
+            future.result()
+            for entity_data in futures[future]:
+                if checkpoint is not None and entity_data.get('search_queries'):
+                    checkpoint.save(entity_data, STAGE_QUERIES)
+            done += len(futures[future])
+            # Update progress bar
+            reporter.progress(done / total_items, f"Processing {done} of {total_items} entities")
+
+    reporter.clear()
+    reporter.success("Finished processing all entities.")
+    return True
+
+def agent_query_runner(agent_executor, scheduler=None):
+    """Return a `run_query(query) -> output` function that drives the agent under the scheduler."""
+    def run_query(query):
+        if scheduler is not None:
+            scheduler.acquire()
+        try:
+            result = agent_executor.invoke({"input": query})
+        except Exception as e:
+            if scheduler is not None and is_rate_limit_error(e):
+                scheduler.on_rate_limit(e)
+            raise
+        if scheduler is not None:
+            scheduler.on_success()
+        return result['output']
+    return run_query
+
+
+def search_entity(entity, agent_executor, scheduler=None, max_queries=3, max_workers=3):
+    """Run an entity's search queries through the agent, collecting outputs in `one_value`.
+
+    Returns the error messages of failed queries; each failure is recorded as
+    "Error" in `one_value` so the remaining queries still run.
+    """
+    return run_entity_queries(
+        [entity], agent_query_runner(agent_executor, scheduler),
+        max_workers=max_workers, max_queries=max_queries
+    )
+
+
+@registry.span("phase", phase="search")
+def run_search_phase(entities, run_query, max_workers=4, max_queries=3, checkpoint=None, reporter=None):
+    """Third phase driver shared by the agent and direct modes.
+
+    Queries of all entities run concurrently; the progress bar is refreshed
+    from this thread at most a few times per second, so workers never wait on
+    the UI.
+    """
+    reporter = reporter or StreamlitReporter()
+    pending = [
+        entity for entity in entities
+        if checkpoint is None or not checkpoint.restore(entity, STAGE_SEARCH)
+    ]
+    entities_done = [len(entities) - len(pending)]
+    last_render = [0.0]
+
+    # Entities often share queries (e.g. rows of one county); search each distinct one once
+    plan = plan_queries(pending, max_queries)
+    registry.inc("search_queries_total", plan.total, kind="planned")
+    registry.inc("search_queries_total", plan.distinct, kind="distinct")
+    if plan.total:
+        reporter.info(f"{plan.total} search queries, {plan.distinct} distinct "
+                      f"({plan.dedup_ratio:.0%} served from another entity's search)")
+
+    def show_progress(done, total):
+        if done == total or time.monotonic() - last_render[0] > 0.25:
+            reporter.progress(
+                done / total,
+                f"Searching ({done}/{total} queries, {entities_done[0]}/{len(entities)} entities)"
+            )
+            last_render[0] = time.monotonic()
+
+    def finish_entity(entity, errors):
+        entities_done[0] += 1
+        if checkpoint is not None and not errors:
+            checkpoint.save(entity, STAGE_SEARCH)
+
+    try:
+        for message in run_entity_queries(pending, run_query, max_workers, max_queries,
+                                          on_progress=show_progress, on_entity_done=finish_entity, plan=plan):
+            reporter.warning(message)
     except Exception as e:
-        st.error(f"Error processing queries: {e}")    
-        
+        reporter.error(f"Error processing queries: {e}")
     finally:   # Clear progress indicators
-        entity_progress.empty()
-        query_progress.empty()
-        
-        # Show completion message
-    st.success("All queries have been processed!")
+        reporter.clear()
+    reporter.success("All queries have been processed!")
+
+
+def process_queries_with_delay(entities, agent_executor, scheduler=None, max_queries=3, checkpoint=None,
+                               max_workers=4, reporter=None):
+    """Process queries through the agent concurrently, paced by the shared scheduler, with a limit per entity"""
+    run_search_phase(entities, agent_query_runner(agent_executor, scheduler), max_workers, max_queries,
+                     checkpoint, reporter)
+
+
+def run_entity_queries(entities, run_query, max_workers=4, max_queries=3, on_progress=None, on_entity_done=None,
+                       plan=None):
+    """Run the search queries of many entities concurrently, each distinct query once.
+
+    Queries are grouped by their canonical form (see `plan_queries`); every
+    distinct query is an independent task on one thread pool and its result
+    is fanned out to the `one_value` slot of each entity that asked for it,
+    so query order is kept and a failing query only turns its own slots into
+    "Error". Callbacks run in the calling thread: `on_progress(done, total)`
+    after each distinct query and `on_entity_done(entity, errors)` once all
+    of an entity's queries finished.
+    """
+    if plan is None:
+        plan = plan_queries(entities, max_queries)
+    remaining = {}
+    for entity in entities:
+        queries = (entity.get('search_queries') or [])[:max_queries]
+        entity['one_value'] = [None] * len(queries)
+        remaining[id(entity)] = len(queries)
+        if not queries and on_entity_done is not None:
+            on_entity_done(entity, [])
 
+    def run(query):
+        with registry.span("query", phase="search"):
+            return run_query(query)
 
-def process_entities(selected_columns_data, agent_executor):
+    errors = {}
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        futures = {executor.submit(run, query): key for key, query in plan.queries.items()}
+        for done, future in enumerate(as_completed(futures), start=1):
+            key = futures[future]
+            try:
+                result, error = future.result(), None
+            except Exception as e:
+                result, error = "Error", e
+            for entity, query_idx in plan.subscribers[key]:
+                entity['one_value'][query_idx] = result
+                if error is not None:
+                    message = f"Error processing query for {entity.get('County', 'Unknown')}: {error}"
+                    logging.warning(message)
+                    errors.setdefault(id(entity), []).append(message)
+                remaining[id(entity)] -= 1
+                if remaining[id(entity)] == 0 and on_entity_done is not None:
+                    on_entity_done(entity, errors.get(id(entity), []))
+            if on_progress is not None:
+                on_progress(done, len(futures))
+    return [message for messages in errors.values() for message in messages]
+
+
+def search_entity_direct(entity, search_fn, max_queries=3, max_workers=3):
+    """Direct mode: put the raw search snippets of an entity's queries into `one_value`.
+
+    Returns the error messages of failed queries.
+    """
+    return run_entity_queries([entity], search_fn, max_workers=max_workers, max_queries=max_queries)
+
+
+def process_queries_direct(entities, search_fn, max_workers=4, max_queries=3, checkpoint=None, reporter=None):
+    """Third phase, direct mode: run the generated queries on the search tool without the agent.
+
+    The raw snippets go straight to the extraction phase, which saves the
+    agent's several LLM round-trips per query.
+    """
+    run_search_phase(entities, search_fn, max_workers, max_queries, checkpoint, reporter)
+
+
+def process_entities(selected_columns_data, agent_executor, reporter=None):
     """Third phase: Process entities with the agent"""
+    reporter = reporter or StreamlitReporter()
     if not agent_executor:
-        st.error("Agent executor not initialized")
+        reporter.error("Agent executor not initialized")
         return False
     
     try:
         process_queries_with_delay(
             selected_columns_data, 
             agent_executor,
-            delay_range=(1, 3),
-            max_queries=3
+            max_queries=3,
+            reporter=reporter
         )
         return True
     except Exception as e:
-        st.error(f"Error processing entities: {e}")
+        reporter.error(f"Error processing entities: {e}")
         return False
 
 
-def final_processing(selected_columns_data, llm2, behaviour_control):
-    """Fourth phase: Final processing and CSV generation"""
+@registry.span("entity", phase="extract")
+def extract_entity(dict_element, llm2, behaviour_control, fast_path=None, scheduler=None,
+                   evidence_budget=DEFAULT_TOKEN_BUDGET):
+    """Ask llm2 for the final [type, value] answer of one entity and store it on the entity.
+
+    When a `fast_path` extractor is confident enough, its answer is used and
+    the LLM is not called. The search results are compacted to at most
+    `evidence_budget` tokens first (None sends them all). Returns the
+    [type, value] list, or None if the entity could not be processed.
+    """
+    if fast_path is not None:
+        extraction = fast_path.extract(dict_element)
+        if extraction is not None:
+            registry.inc("fast_path_total", result="hit", extractor=extraction.type)
+            dict_element[extraction.type] = extraction.value
+            return [extraction.type, extraction.value]
+
+    scheduler = scheduler or AdaptiveScheduler()
+    rate_limit_attempts = 0
+    while True:  # Add retry loop for rate limits
+        try:
+            evidence = compact_evidence(dict_element['search_queries'], dict_element['one_value'], evidence_budget)
+            registry.inc("evidence_tokens_total", count_tokens("\n".join(map(str, dict_element['one_value']))),
+                         kind="raw")
+            registry.inc("evidence_tokens_total", count_tokens(evidence), kind="compacted")
+            chain_input = {
+                "search_query": "\n".join(dict_element['search_queries']),
+                "one_value": evidence
+            }
+            
+            # Render the prompt explicitly so cached and plain models are invoked the same way
+            messages = behaviour_control.format_messages(**chain_input)
+            response = invoke_paced(llm2, messages, scheduler)
+            
+            try:
+                response_list = ast.literal_eval(response.content)
+                dict_element[response_list[0]] = response_list[1]
+            except Exception:
+                discard_response(llm2, messages)
+                raise
+            return response_list  # Success - exit retry loop
+            
+        except Exception as e:
+            if is_rate_limit_error(e):
+                rate_limit_attempts += 1
+                registry.inc("retries_total", phase="extract", reason="rate_limit")
+                delay = scheduler.on_rate_limit(e, rate_limit_attempts)
+                logging.warning(f"Rate limit reached. Waiting for {delay:.1f} seconds...")
+                continue  # Retry the same element
+            logging.error(f"Error processing element: {e}")
+            return None  # Exit retry loop on non-rate-limit errors
+
+
+@registry.span("phase", phase="extract")
+def final_processing(selected_columns_data, llm2, behaviour_control, checkpoint=None, results=None,
+                     fast_path=None, scheduler=None, reporter=None, answers=None):
+    """Fourth phase: Final processing and CSV generation
+
+    Each entity is added to `results` (a ResultTable) as soon as it is
+    extracted, so the output file grows incrementally. New answers are
+    recorded in `answers` (a JobAnswers) for later runs.
+    """
+    reporter = reporter or StreamlitReporter()
     try:
-        # Verify API key is available and valid
-        api_key = os.environ.get("GROQ_API_KEY_2")
-        if not api_key:
-            st.error("Missing GROQ_API_KEY_2 in environment variables")
-            return False
+        if results is None:
+            results = ResultTable('output.csv')
             
-        for dict_element in selected_columns_data:
-            while True:  # Add retry loop for rate limits
-                try:
-                    chain_input = {
-                        "search_query": "\n".join(dict_element['search_queries']),
-                        "one_value": "\n".join(dict_element['one_value'])
-                    }
-                    
-                    chain = behaviour_control | llm2
-                    response = chain.invoke(chain_input)
-                    
-                    response_list = ast.literal_eval(response.content)
-                    dict_element[response_list[0]] = response_list[1]
-                    
-                    # Add delay between requests
-                    time.sleep(2)
-                    break  # Success - exit retry loop
-                    
-                except groq.RateLimitError as e:
-                    print(f"Rate limit reached. Waiting for 30 seconds...")
-                    time.sleep(39)  # Wait for rate limit reset
-                    continue  # Retry the same element
-                except Exception as e:
-                    print(f"Error processing element: {e}")
-                    break  # Exit retry loop on non-rate-limit errors
-        
-        # Collect all unique keys from all dictionaries
-        all_keys = set()
-        for dict_element in selected_columns_data:
-            all_keys.update(dict_element.keys())
+        total_items = len(selected_columns_data)
+        for done, dict_element in enumerate(selected_columns_data, start=1):
+            if checkpoint is None or not checkpoint.restore(dict_element, STAGE_EXTRACT):
+                response_list = extract_entity(dict_element, llm2, behaviour_control, fast_path, scheduler)
+                if checkpoint is not None and response_list is not None:
+                    checkpoint.save(dict_element, STAGE_EXTRACT, response_list)
+                if answers is not None and response_list is not None:
+                    answers.save(dict_element, response_list)
+            results.add(dict_element)
+            reporter.progress(done / total_items, f"Extracted {done} of {total_items} entities")
         
-        # Filter out processing keys and create final columns list
-        columns = [key for key in all_keys 
-                  if key not in ['search_queries', 'one_value']]
-        
-        # Generate CSV
-        with open('output.csv', mode='w', newline='', encoding='utf-8') as file:
-            writer = csv.DictWriter(file, fieldnames=columns)
-            writer.writeheader()
-            for dict_element in selected_columns_data:
-                data_for_csv = {
-                    key: (', '.join(str(v) for v in value) if isinstance(value, list) else value) 
-                    for key, value in dict_element.items() 
-                    if key not in ['search_queries', 'one_value']
-                }
-                writer.writerow(data_for_csv)
-        
-        st.success("CSV file has been created successfully.")
-        display_csv_file("output.csv")
+        reporter.clear()
+        reporter.success("CSV file has been created successfully.")
+        reporter.show_results(results)
         return True
     except Exception as e:
-        st.error(f"Error in final processing: {e}")
+        reporter.error(f"Error in final processing: {e}")
         return False
+
+
+@registry.span("phase", phase="pipeline")
+def process_entities_streaming(selected_columns_data, llm, search_query_prompt, query, agent_executor,
+                               llm2, behaviour_control, results=None,
+                               requests_per_second=0.5, queue_size=16,
+                               checkpoint=None, fast_path=None, scheduler=None, search_fn=None,
+                               reporter=None, answers=None):
+    """Run generate -> search -> extract per entity, writing each result as soon as it is ready.
+
+    Unlike the phased functions above, an entity enters the search stage as
+    soon as its own queries exist, and its rows are added to `results` (and
+    its output file) and shown in the UI as soon as extraction finishes.
+    With a `search_fn` and no `agent_executor`, the search stage runs in
+    direct mode and feeds raw snippets to extraction. With a `checkpoint`,
+    every stage result is recorded as it happens and replayed on the next run;
+    final answers also go to `answers`, if given.
+    """
+    reporter = reporter or StreamlitReporter()
+    if not selected_columns_data:
+        reporter.error("No data to process")
+        return False
+
+    if scheduler is None:
+        scheduler = AdaptiveScheduler(requests_per_second)
+
+    def generate(entity):
+        if entity.get('_done') or (checkpoint is not None and checkpoint.restore(entity, STAGE_QUERIES)):
+            return
+        if generate_entity_queries(entity, llm, search_query_prompt, query, scheduler=scheduler) \
+                and checkpoint is not None:
+            checkpoint.save(entity, STAGE_QUERIES)
+
+    def search(entity):
+        if entity.get('_done') or (checkpoint is not None and checkpoint.restore(entity, STAGE_SEARCH)):
+            return
+        if agent_executor is None:
+            errors = search_entity_direct(entity, search_fn)
+        else:
+            errors = search_entity(entity, agent_executor, scheduler)
+        if not errors and checkpoint is not None:
+            checkpoint.save(entity, STAGE_SEARCH)
+
+    def extract(entity):
+        if entity.pop('_done', False):
+            return
+        response_list = extract_entity(entity, llm2, behaviour_control, fast_path, scheduler)
+        if response_list is not None and checkpoint is not None:
+            checkpoint.save(entity, STAGE_EXTRACT, response_list)
+        if response_list is not None and answers is not None:
+            answers.save(entity, response_list)
+
+    # Entities that finished in an earlier run skip straight through every stage
+    if checkpoint is not None:
+        for entity in selected_columns_data:
+            if checkpoint.restore(entity, STAGE_EXTRACT):
+                entity['_done'] = True
+
+    stages = [
+        ("generate", generate, 2),
+        ("search", search, 2),
+        ("extract", extract, 1),
+    ]
+
+    if results is None:
+        results = ResultTable('output.csv')
+    reporter.progress(0, "Waiting for first result...")
+    total_items = len(selected_columns_data)
+    last_render = 0.0
+
+    for done, entity in enumerate(run_streaming_pipeline(selected_columns_data, stages, queue_size), start=1):
+        results.add(entity)
+        reporter.progress(done / total_items, f"Completed {done} of {total_items} entities")
+        # Re-rendering the table is O(rows), so throttle it
+        if time.monotonic() - last_render > 1.0 or done == total_items:
+            reporter.preview(results)
+            last_render = time.monotonic()
+
+    reporter.clear()
+    reporter.success("CSV file has been created successfully.")
+    reporter.show_results(results)
+    return True
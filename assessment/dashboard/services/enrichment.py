@@ -0,0 +1,61 @@
+from .data_processor import (
+    process_search_queries,
+    process_queries_with_delay,
+    process_queries_direct,
+    final_processing,
+    process_entities_streaming,
+    behaviour_control
+)
+from .progress import StreamlitReporter
+
+
+def run_enrichment(entities, query, llm, search_query_prompt, results, reporter=None, mode="agent",
+                   streaming=False, agent_executor=None, search_fn=None, checkpoint=None, fast_path=None,
+                   scheduler=None, batch_size=10, llm2=None, answers=None):
+    """Run every phase over `entities`, adding each finished entity to `results`.
+
+    `mode` is "agent" (needs `agent_executor`) or "direct" (needs `search_fn`).
+    With `streaming`, entities flow through the stages one by one; otherwise
+    the four phases run one after the other. With `answers` (a prefetched
+    JobAnswers), entities with a fresh stored answer skip every phase.
+    Returns True on success.
+    """
+    reporter = reporter or StreamlitReporter()
+    llm2 = llm2 or llm
+    if mode == "agent" and agent_executor is None:
+        reporter.error("Agent executor not initialized")
+        return False
+
+    if answers is not None:
+        pending = []
+        restored = []
+        for entity in entities:
+            (restored if answers.restore(entity) else pending).append(entity)
+        results.add_many(restored)
+        if not pending:
+            reporter.success("Every entity has a stored answer; nothing to run")
+            reporter.show_results(results)
+            return True
+        entities = pending
+
+    if streaming:
+        return process_entities_streaming(
+            entities, llm, search_query_prompt, query,
+            agent_executor if mode == "agent" else None, llm2, behaviour_control, results=results,
+            checkpoint=checkpoint, fast_path=fast_path, scheduler=scheduler, search_fn=search_fn,
+            reporter=reporter, answers=answers
+        )
+
+    # Phase 1: Generate search queries
+    if not process_search_queries(entities, llm, search_query_prompt, query, batch_size=batch_size,
+                                  checkpoint=checkpoint, scheduler=scheduler, reporter=reporter):
+        return False
+    # Phase 3: Search, through the agent or straight to the search tool
+    if mode == "direct":
+        process_queries_direct(entities, search_fn, checkpoint=checkpoint, reporter=reporter)
+    else:
+        process_queries_with_delay(entities, agent_executor, scheduler=scheduler, checkpoint=checkpoint,
+                                   reporter=reporter)
+    # Phase 4: Final processing and CSV generation
+    return final_processing(entities, llm2, behaviour_control, checkpoint=checkpoint, results=results,
+                            fast_path=fast_path, scheduler=scheduler, reporter=reporter, answers=answers)
@@ -0,0 +1,194 @@
+import sys
+from collections.abc import MutableMapping, Sequence
+import pandas as pd
+
+
+# Stage outputs every record has a fixed slot for
+SEARCH_QUERIES = 'search_queries'
+ONE_VALUE = 'one_value'
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class EntityRecord(MutableMapping):
+    """One entity of an EntityBatch, with fixed slots for the stage outputs.
+
+    It reads and writes like the dict the pipeline used to pass around
+    (`entity['one_value']`, `entity[answer_type] = value`, ...). Column values
+    stay in the batch's column lists and are read-only; `search_queries`,
+    `one_value` and the extracted answer (whatever its type, e.g. a year
+    returned as a number) are slots. Anything else (e.g. the streaming `_done`
+    flag) goes to a small dict that is only created when needed.
+    """
+
+    __slots__ = ("_batch", "_row", "search_queries", "one_value", "answer_type", "answer", "_extra")
+
+    def __init__(self, batch, row):
+        self._batch = batch
+        self._row = row
+        self.search_queries = None
+        self.one_value = None
+        self.answer_type = None
+        self.answer = None
+        self._extra = None
+
+    def __getitem__(self, key):
+        position = self._batch.positions.get(key)
+        if position is not None:
+            return self._batch.data[position][self._row]
+        if key == SEARCH_QUERIES:
+            value = self.search_queries
+        elif key == ONE_VALUE:
+            value = self.one_value
+        elif key == self.answer_type and key is not None:
+            return self.answer
+        else:
+            value = self._extra.get(key) if self._extra else None
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        if key in self._batch.positions:
+            # Column values are shared with the batch (and key the entity); an answer named
+            # like a column is kept beside it, under the name ResultTable gives such clashes
+            key = f"{key}_enriched"
+        if key == SEARCH_QUERIES:
+            self.search_queries = value
+        elif key == ONE_VALUE:
+            self.one_value = value
+        elif not (isinstance(key, str) and key.startswith('_')) and self.answer_type in (None, key):
+            self.answer_type = _intern(key)
+            self.answer = value
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+
+    def __delitem__(self, key):
+        if key in self._batch.positions:
+            raise KeyError(f"Cannot delete column {key!r}")
+        self[key]  # KeyError if unset
+        if key == SEARCH_QUERIES:
+            self.search_queries = None
+        elif key == ONE_VALUE:
+            self.one_value = None
+        elif key == self.answer_type:
+            self.answer_type = self.answer = None
+        else:
+            del self._extra[key]
+
+    def __iter__(self):
+        return iter([key for key, _ in self.items()])
+
+    def __len__(self):
+        return len(self.items())
+
+    def __contains__(self, key):
+        try:
+            self[key]
+        except KeyError:
+            return False
+        return True
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def items(self):
+        """(key, value) pairs in the order a dict would have them: columns, stage outputs, answer, extras."""
+        row = self._row
+        pairs = [(column, values[row]) for column, values in zip(self._batch.columns, self._batch.data)]
+        if self.search_queries is not None:
+            pairs.append((SEARCH_QUERIES, self.search_queries))
+        if self.one_value is not None:
+            pairs.append((ONE_VALUE, self.one_value))
+        if self.answer_type is not None:
+            pairs.append((self.answer_type, self.answer))
+        if self._extra:
+            pairs.extend(self._extra.items())
+        return pairs
+
+    def merge_results(self, other):
+        """Take the stage outputs and answer of `other`, the same entity processed elsewhere (e.g. a worker process).
+
+        Column values are left alone: they are this batch's own and would
+        otherwise come back as answers named like a column.
+        """
+        self.search_queries = other.search_queries
+        self.one_value = other.one_value
+        self.answer_type = other.answer_type
+        self.answer = other.answer
+
+    def __repr__(self):
+        # Prompts embed entities, so they must render exactly like the dicts they replace
+        return repr(dict(self.items()))
+
+    def __getstate__(self):
+        # Worker processes get the record's own values rather than the whole batch
+        return (self._batch.columns, [values[self._row] for values in self._batch.data], self.search_queries,
+                self.one_value, self.answer_type, self.answer, self._extra)
+
+    def __setstate__(self, state):
+        columns, values, self.search_queries, self.one_value, self.answer_type, self.answer, self._extra = state
+        self._batch = EntityBatch(columns, [[value] for value in values], records=False)
+        self._row = 0
+
+
+class EntityBatch(Sequence):
+    """The entities of one job, stored column by column.
+
+    `data` holds one list per selected column and each EntityRecord only
+    knows its row, so an entity costs a few slots instead of a dict. Equal
+    values within a column share one object and names are interned, so
+    repeated values (the same country on many entities) are stored once.
+    Indexing returns the same record object every time, so `id(entity)` can
+    key per-entity state.
+    """
+
+    def __init__(self, columns, data, records=True):
+        self.columns = tuple(_intern(column) for column in columns)
+        self.positions = {column: i for i, column in enumerate(self.columns)}
+        self.data = data
+        self._records = [EntityRecord(self, row) for row in range(len(data[0]) if data else 0)] if records else []
+
+    @classmethod
+    def from_frame(cls, df, columns, positions=None):
+        """Build a batch from `columns` of `df` (only the rows at `positions`, if given)."""
+        frame = df[list(columns)]
+        if positions is not None:
+            frame = frame.iloc[positions]
+        data = []
+        for column in columns:
+            values = frame[column].tolist()
+            if not pd.api.types.is_numeric_dtype(frame[column].dtype):
+                # Batch-local interning: equal values share one object, unique ones cost nothing extra
+                shared = {}
+                values = [shared.setdefault(value, value) for value in values]
+            data.append(values)
+        return cls(columns, data)
+
+    def __len__(self):
+        return len(self._records)
+
+    def __getitem__(self, index):
+        return self._records[index]
+
+    def clear_results(self):
+        """Drop every record's stage outputs and answer, e.g. before the same job runs again."""
+        for record in self._records:
+            record.search_queries = record.one_value = record.answer_type = record.answer = None
+            record._extra = None
+
+    def to_frame(self):
+        """Column values and answers as a DataFrame, one row per entity."""
+        frame = pd.DataFrame(dict(zip(self.columns, self.data)), columns=list(self.columns))
+        for answer_type in dict.fromkeys(record.answer_type for record in self._records if record.answer_type):
+            if answer_type not in frame.columns:
+                frame[answer_type] = [record.answer if record.answer_type == answer_type else None
+                                      for record in self._records]
+        return frame
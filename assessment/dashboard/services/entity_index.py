@@ -0,0 +1,53 @@
+import copy
+import numpy as np
+import pandas as pd
+from .entity_batch import EntityBatch
+
+
+NORMALIZATIONS = {
+    "casefold": "Case folding",
+    "strip": "Trim whitespace",
+    "unicode": "Unicode (NFKC)",
+}
+
+
+def normalize_series(series, normalizations=tuple(NORMALIZATIONS)):
+    """Vectorized key normalization so 'Kent', 'kent ' and 'KENT' dedupe together."""
+    normalized = series.astype("string")
+    if "unicode" in normalizations:
+        normalized = normalized.str.normalize("NFKC")
+    if "strip" in normalizations:
+        normalized = normalized.str.strip().str.replace(r"\s+", " ", regex=True)
+    if "casefold" in normalizations:
+        normalized = normalized.str.casefold()
+    return normalized
+
+
+class EntityIndex:
+    """Unique entities of a frame plus the mapping from every source row to its entity.
+
+    `records` is an EntityBatch with one record per normalized key, using the
+    original values of its first occurrence; `codes[row]` is the position of that row's entity in
+    `records`, which lets results be fanned out to every source row.
+    """
+
+    def __init__(self, df, selected_columns, normalizations=tuple(NORMALIZATIONS)):
+        self.df = df
+        self.selected_columns = list(selected_columns)
+        keys = pd.DataFrame(
+            {column: normalize_series(df[column], normalizations) for column in self.selected_columns}
+        )
+        # Groups are numbered in order of first appearance
+        self.codes = keys.groupby(self.selected_columns, sort=False, dropna=False).ngroup().to_numpy()
+        self.first_positions = np.flatnonzero(~pd.Series(self.codes).duplicated().to_numpy())
+        self.records = EntityBatch.from_frame(df, self.selected_columns, self.first_positions)
+
+    def fork(self):
+        """The same index with its own records, so a job never sees another job's stage results."""
+        index = copy.copy(self)
+        index.records = EntityBatch.from_frame(self.df, self.selected_columns, self.first_positions)
+        return index
+
+    def row_positions(self):
+        """Return {entity position: array of source row positions}."""
+        return pd.Series(np.arange(len(self.codes))).groupby(self.codes).indices
@@ -0,0 +1,130 @@
+import math
+import re
+from collections import Counter
+from functools import lru_cache
+from .query_planner import STOPWORDS
+
+try:
+    import tiktoken
+except ImportError:  # tiktoken is optional; token counts fall back to a character estimate
+    tiktoken = None
+
+
+# Per-entity token budget for the search results sent to llm2
+DEFAULT_TOKEN_BUDGET = 600
+NEAR_DUPLICATE_THRESHOLD = 0.8
+
+_LINK_PATTERN = re.compile(r"\blink:\s*\S+")
+_SEPARATOR_PATTERN = re.compile(r"\]\s*,?\s*\[|\[|\]|\b(?:snippet|title):\s*")
+_SENTENCE_PATTERN = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9\"'(])|\n+")
+_TOKEN_PATTERN = re.compile(r"\w+")
+# Sentences with a figure usually carry the answer (populations, counts, prices, dates)
+_FIGURE_PATTERN = re.compile(r"\d")
+# Share of the budget kept for sentences with figures before the rest compete on relevance
+ANSWER_BUDGET_SHARE = 0.5
+
+_encoding = None
+
+
+def count_tokens(text):
+    """Token count of `text` with tiktoken when installed, else ~4 characters per token."""
+    global _encoding
+    if tiktoken is not None:
+        if _encoding is None:
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        return len(_encoding.encode(text))
+    return max(1, math.ceil(len(text) / 4))
+
+
+@lru_cache(maxsize=65536)
+def estimate_tokens(sentence):
+    """Cached `count_tokens` for sentences, which repeat across entities sharing a search result."""
+    return count_tokens(sentence)
+
+
+def split_sentences(text):
+    """Split raw agent output or search snippets into sentences, dropping links and markup."""
+    text = _LINK_PATTERN.sub(" ", str(text))
+    text = _SEPARATOR_PATTERN.sub("\n", text)
+    sentences = []
+    for sentence in _SENTENCE_PATTERN.split(text):
+        sentence = sentence.strip(" ,;\t")
+        if len(sentence) > 2:
+            sentences.append(sentence)
+    return sentences
+
+
+def _terms(text):
+    return [token for token in _TOKEN_PATTERN.findall(text.casefold()) if token not in STOPWORDS]
+
+
+def remove_near_duplicates(sentences, threshold=NEAR_DUPLICATE_THRESHOLD):
+    """Keep the first of every group of sentences whose term sets overlap by `threshold` (Jaccard)."""
+    kept, kept_terms = [], []
+    for sentence in sentences:
+        terms = set(_terms(sentence))
+        if any(terms == other or (terms and len(terms & other) / len(terms | other) >= threshold)
+               for other in kept_terms):
+            continue
+        kept.append(sentence)
+        kept_terms.append(terms)
+    return kept
+
+
+def rank_sentences(sentences, search_queries, k1=1.2, b=0.75):
+    """BM25 scores of `sentences` against the terms of all `search_queries`."""
+    query_terms = set(term for query in search_queries for term in _terms(str(query)))
+    documents = [Counter(_terms(sentence)) for sentence in sentences]
+    if not documents:
+        return []
+    average_length = sum(sum(document.values()) for document in documents) / len(documents) or 1.0
+    document_frequency = Counter(term for document in documents for term in document)
+    scores = []
+    for document in documents:
+        length = sum(document.values())
+        score = 0.0
+        for term in query_terms:
+            frequency = document.get(term, 0)
+            if not frequency:
+                continue
+            idf = math.log(1 + (len(documents) - document_frequency[term] + 0.5) / (document_frequency[term] + 0.5))
+            score += idf * frequency * (k1 + 1) / (frequency + k1 * (1 - b + b * length / average_length))
+        scores.append(score)
+    return scores
+
+
+def compact_evidence(search_queries, answers, budget=DEFAULT_TOKEN_BUDGET):
+    """Condense an entity's search results to at most `budget` tokens for the extraction prompt.
+
+    Failed queries are left out and results that then fit are joined
+    unchanged. Otherwise they are split into sentences and near-duplicates
+    are dropped. Ranking is lexical, which favours filler that repeats the
+    query, so sentences with figures (the likely answers) first get part of
+    the budget to themselves; the rest goes to the most relevant sentences.
+    The chosen sentences keep their original order.
+    """
+    answers = [str(answer) for answer in answers if answer and answer != "Error"]
+    raw = "\n".join(answers)
+    if not budget or count_tokens(raw) <= budget:
+        return raw
+
+    sentences = remove_near_duplicates([s for answer in answers for s in split_sentences(answer)])
+    scores = rank_sentences(sentences, search_queries)
+    ranked = sorted(range(len(sentences)), key=lambda i: (-scores[i], i))
+    chosen, used = set(), 0
+
+    def fill(candidates, limit):
+        nonlocal used
+        for i in candidates:
+            cost = estimate_tokens(sentences[i])
+            if i in chosen or used + cost > limit:
+                continue
+            chosen.add(i)
+            used += cost
+
+    fill([i for i in ranked if _FIGURE_PATTERN.search(sentences[i])], budget * ANSWER_BUDGET_SHARE)
+    fill(ranked, budget)
+    if not chosen and ranked:
+        # A single overlong sentence: keep its head rather than nothing
+        return sentences[ranked[0]][:budget * 4]
+    return "\n".join(sentences[i] for i in sorted(chosen))
@@ -0,0 +1,200 @@
+import ast
+import re
+import threading
+from collections import Counter, namedtuple
+
+
+# A fast-path answer: the same [type, value] pair the LLM returns, plus how sure we are
+Extraction = namedtuple("Extraction", ["type", "value", "confidence"])
+
+_EXTRACTORS = []
+
+
+def register_extractor(func):
+    """Add `func(search_queries, answers) -> Extraction | None` to the default fast path."""
+    _EXTRACTORS.append(func)
+    return func
+
+
+_NUMBER = r"\d{1,3}(?:,\d{3})+(?:\.\d+)?|\d+(?:\.\d+)?"
+_SCALE = r"\s*(million|thousand|m\b|k\b)?"
+_RANGE_PATTERN = re.compile(rf"({_NUMBER}){_SCALE}\s*(?:-|–|to)\s*({_NUMBER}){_SCALE}", re.IGNORECASE)
+_NUMBER_PATTERN = re.compile(rf"({_NUMBER}){_SCALE}", re.IGNORECASE)
+_POPULATION_WORDS = re.compile(r"population|people|residents|inhabitants", re.IGNORECASE)
+_MULTIPLIERS = {"million": 1_000_000, "m": 1_000_000, "thousand": 1_000, "k": 1_000}
+# Figures that are about population but are not a population: densities, rates and changes
+_APPROXIMATELY = r"(?:about|around|roughly|nearly|almost|over|some|approximately|an estimated)?\s*"
+_CHANGE_BEFORE = re.compile(
+    r"(?:density\b[^,;]*"
+    rf"|\b(?:grew|grown|growing|increased?|rose|risen|fell|fallen|declined?|decreased?|dropped|shrank|changed?)"
+    rf"\s+(?:by\s+)?{_APPROXIMATELY}"
+    rf"|\b(?:increase|growth|decline|decrease|rise|drop|change|gain|loss)\s+of\s+{_APPROXIMATELY})$",
+    re.IGNORECASE
+)
+_RATE_AFTER = re.compile(r"^\s*(?:%|percent\b|per\s?cent\b|(?:\w+\s+){0,2}per\b|/)", re.IGNORECASE)
+# Figures that are not a current head count: areas and lengths, and projections
+_UNIT_AFTER = re.compile(
+    r"^\s*(?:sq(?:uare)?\.?\s*)?(?:km\b|kilomet|metres?\b|meters?\b|miles?\b|mi\b|hectares?\b|ha\b|acres?\b)",
+    re.IGNORECASE
+)
+_PROJECTION_BEFORE = re.compile(
+    r"\b(?:expected|projected|projection|forecasts?|forecasted|predicted|anticipated|set to|will|could)\b[^.,;]*$",
+    re.IGNORECASE
+)
+_PROJECTION_AFTER = re.compile(r"^(?:\s+\w+){0,2}?\s+by\s+(?:the\s+)?(?:year\s+)?\d{4}\b", re.IGNORECASE)
+
+
+def _to_number(text, scale):
+    value = float(text.replace(",", ""))
+    return value * _MULTIPLIERS.get((scale or "").lower(), 1)
+
+
+def _is_year(text, scale):
+    return not scale and "," not in text and "." not in text and 1800 <= int(text) <= 2100
+
+
+def _is_rate_or_change(sentence, match):
+    """True if the number at `match` is a density, a rate or a change rather than a head count."""
+    before = sentence[max(0, match.start() - 60):match.start()]
+    return bool(_CHANGE_BEFORE.search(before) or _RATE_AFTER.match(sentence[match.end():match.end() + 40]))
+
+
+def _is_area_or_projection(sentence, match):
+    """True if the number at `match` carries an area or length unit or is a projected figure."""
+    after = sentence[match.end():match.end() + 40]
+    before = sentence[max(0, match.start() - 60):match.start()]
+    return bool(_UNIT_AFTER.match(after) or _PROJECTION_AFTER.match(after) or _PROJECTION_BEFORE.search(before))
+
+
+def _is_head_count(sentence, match):
+    return not (_is_rate_or_change(sentence, match) or _is_area_or_projection(sentence, match))
+
+
+def _distance(span, words):
+    """Characters between `span` and the nearest population word."""
+    return min(max(word.start() - span[1], span[0] - word.end(), 0) for word in words)
+
+
+def _population_estimate(answer):
+    """The population figure nearest a population word, in the first sentence of `answer` that has one.
+
+    Returns (value, is_range) or None.
+    """
+    for sentence in re.split(r"(?<=[.!?])\s+", answer):
+        words = list(_POPULATION_WORDS.finditer(sentence))
+        if not words:
+            continue
+        candidates = []  # (distance, position, value, is_range)
+        ranges = []
+        for match in _RANGE_PATTERN.finditer(sentence):
+            if not _is_head_count(sentence, match):
+                continue
+            low = _to_number(match.group(1), match.group(2) or match.group(4))
+            high = _to_number(match.group(3), match.group(4))
+            if low < high:
+                ranges.append(match.span())
+                candidates.append((_distance(match.span(), words), match.start(), (low + high) / 2, True))
+        for match in _NUMBER_PATTERN.finditer(sentence):
+            number, scale = match.group(1), match.group(2)
+            if any(start <= match.start() < end for start, end in ranges):
+                continue  # One end of a range already counted
+            if _is_year(number, scale) or not _is_head_count(sentence, match):
+                continue
+            value = _to_number(number, scale)
+            if value >= 100:
+                candidates.append((_distance(match.span(), words), match.start(), value, False))
+        if candidates:
+            _, _, value, is_range = min(candidates)
+            return value, is_range
+    return None
+
+
+@register_extractor
+def population_extractor(search_queries, answers):
+    """Population answers are a number with commas removed; parse them directly."""
+    if not any("population" in str(query).lower() for query in search_queries):
+        return None
+    estimates = [estimate for estimate in map(_population_estimate, answers) if estimate is not None]
+    if not estimates:
+        return None
+
+    values = [value for value, _ in estimates]
+    low, high = min(values), max(values)
+    value = sum(values) / len(values)
+    if high - low > 0.02 * high:
+        confidence = 0.5  # Sources disagree, let the LLM weigh them
+    elif len(estimates) > 1:
+        confidence = 0.95
+    else:
+        confidence = 0.85
+    if any(is_range for _, is_range in estimates):
+        confidence -= 0.05
+    return Extraction("Population", str(int(round(value))), round(confidence, 2))
+
+
+def _as_pair(answer):
+    """Parse an answer that is already a ["Type", "Value"] list."""
+    start, end = answer.find('['), answer.rfind(']')
+    if start == -1 or end <= start:
+        return None
+    try:
+        parsed = ast.literal_eval(answer[start:end + 1])
+    except (ValueError, SyntaxError):
+        return None
+    if isinstance(parsed, list) and len(parsed) == 2 and all(isinstance(item, (str, int, float)) for item in parsed):
+        return str(parsed[0]).strip(), str(parsed[1]).strip()
+    return None
+
+
+@register_extractor
+def majority_vote_extractor(search_queries, answers):
+    """When the agent already answered in [type, value] form, take the majority answer."""
+    pairs = [pair for pair in map(_as_pair, answers) if pair is not None]
+    if not pairs:
+        return None
+    counts = Counter((kind, value.casefold()) for kind, value in pairs)
+    (kind, folded), votes = counts.most_common(1)[0]
+    value = next(value for pair_kind, value in pairs if pair_kind == kind and value.casefold() == folded)
+    agreement = votes / len(answers)
+    if votes == len(answers) and votes > 1:
+        confidence = 0.95
+    else:
+        confidence = 0.6 * agreement + 0.3
+    return Extraction(kind, value, round(confidence, 2))
+
+
+class FastPathExtractor:
+    """Runs rule-based extractors before the llm2 call and tracks how often it skips it."""
+
+    def __init__(self, extractors=None, threshold=0.9):
+        self.extractors = list(extractors) if extractors is not None else list(_EXTRACTORS)
+        self.threshold = threshold
+        self.attempts = 0
+        self.skipped = 0
+        self.by_extractor = Counter()
+        self._lock = threading.Lock()
+
+    def extract(self, entity):
+        """Return the best Extraction at or above the threshold, or None to fall back to the LLM."""
+        answers = [answer for answer in entity.get('one_value') or [] if answer and answer != "Error"]
+        best, best_name = None, None
+        if answers:
+            for extractor in self.extractors:
+                result = extractor(entity.get('search_queries') or [], answers)
+                if result is not None and (best is None or result.confidence > best.confidence):
+                    best, best_name = result, extractor.__name__
+        with self._lock:
+            self.attempts += 1
+            if best is None or best.confidence < self.threshold:
+                return None
+            self.skipped += 1
+            self.by_extractor[best_name] += 1
+        return best
+
+    def stats(self):
+        return {
+            "attempts": self.attempts,
+            "skipped": self.skipped,
+            "skip_rate": self.skipped / self.attempts if self.attempts else 0.0,
+            "by_extractor": dict(self.by_extractor),
+        }
@@ -0,0 +1,90 @@
+import codecs
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow is optional; large-file mode falls back to pandas
+    pa = None
+    pq = None
+
+
+ARROW_EXTENSIONS = ('.arrow', '.feather')
+
+
+def detect_encoding(file, chunk_size=1024 * 1024):
+    """Return 'utf-8' if the bytes decode cleanly, else 'latin-1'.
+
+    Decoding incrementally avoids both a failed full parse and a full decoded copy.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    file.seek(0)
+    try:
+        while True:
+            chunk = file.read(chunk_size)
+            if not chunk:
+                break
+            decoder.decode(chunk)
+        decoder.decode(b"", final=True)
+    except UnicodeDecodeError:
+        return "latin-1"
+    finally:
+        file.seek(0)
+    return "utf-8"
+
+
+def _arrow_source(source):
+    """Memory-map files on disk; wrap in-memory uploads without copying them."""
+    if isinstance(source, str):
+        return pa.memory_map(source)
+    return pa.BufferReader(pa.py_buffer(source.getbuffer()))
+
+
+def _read_arrow_table(source):
+    try:
+        return pa.ipc.open_file(_arrow_source(source)).read_all()
+    except pa.ArrowInvalid:
+        # Arrow IPC stream rather than the Feather v2 / file format
+        return pa.ipc.open_stream(_arrow_source(source)).read_all()
+
+
+def read_frame(source, name, columns=None, nrows=None):
+    """Parse a CSV, Excel, Parquet or Arrow/Feather source into a DataFrame.
+
+    `source` is a path or a seekable binary file object. Only `columns` are
+    materialized when given, and `nrows` limits the read to a preview.
+    """
+    name = name.lower()
+    if name.endswith('.parquet'):
+        if pq is None:
+            raise ImportError("pyarrow is required to read Parquet files")
+        parquet_file = pq.ParquetFile(_arrow_source(source))
+        if nrows is not None:
+            batch = next(parquet_file.iter_batches(batch_size=nrows, columns=columns), None)
+            return batch.to_pandas() if batch is not None else parquet_file.schema_arrow.empty_table().to_pandas()
+        return parquet_file.read(columns=columns).to_pandas()
+
+    if name.endswith(ARROW_EXTENSIONS):
+        if pa is None:
+            raise ImportError("pyarrow is required to read Arrow/Feather files")
+        table = _read_arrow_table(source)
+        if columns is not None:
+            table = table.select(columns)
+        if nrows is not None:
+            table = table.slice(0, nrows)
+        return table.to_pandas()
+
+    if name.endswith('.csv'):
+        if isinstance(source, str):
+            with open(source, 'rb') as file:
+                encoding = detect_encoding(file)
+        else:
+            encoding = detect_encoding(source)
+        if columns is not None and nrows is None and pa is not None:
+            # Multi-threaded pyarrow parser with its own type inference
+            return pd.read_csv(source, usecols=columns, encoding=encoding, engine='pyarrow')
+        return pd.read_csv(source, usecols=columns, encoding=encoding, nrows=nrows)
+
+    if not isinstance(source, str):
+        source.seek(0)
+    return pd.read_excel(source, usecols=columns, nrows=nrows)
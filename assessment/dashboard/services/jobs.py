@@ -0,0 +1,168 @@
+import logging
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from .progress import ProgressReporter
+
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+
+class JobQueueFull(RuntimeError):
+    """Raised by JobManager.submit when too many jobs are already waiting."""
+
+
+class JobReporter(ProgressReporter):
+    """Records a background job's progress so the UI can poll it from the script thread."""
+
+    def __init__(self, max_messages=50):
+        self.fraction = 0.0
+        self.text = ""
+        self.messages = deque(maxlen=max_messages)  # (level, message)
+        self.results = None
+        self._lock = threading.Lock()
+
+    def progress(self, fraction, text=""):
+        with self._lock:
+            self.fraction = min(max(fraction, 0.0), 1.0)
+            self.text = text
+
+    def _record(self, level, message):
+        with self._lock:
+            self.messages.append((level, message))
+
+    def info(self, message):
+        super().info(message)
+        self._record("info", message)
+
+    def success(self, message):
+        super().success(message)
+        self._record("success", message)
+
+    def warning(self, message):
+        super().warning(message)
+        self._record("warning", message)
+
+    def error(self, message):
+        super().error(message)
+        self._record("error", message)
+
+    def preview(self, results):
+        self.results = results
+
+    def show_results(self, results):
+        self.results = results
+
+
+class Job:
+    """One enrichment run owned by a session; `key` identifies what it computes."""
+
+    def __init__(self, owner, key, label):
+        self.id = uuid.uuid4().hex[:8]
+        self.owner = owner
+        self.key = key
+        self.label = label
+        self.status = QUEUED
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.reporter = JobReporter()
+        self.cancel_event = threading.Event()
+        self.future = None
+
+    @property
+    def active(self):
+        return self.status in (QUEUED, RUNNING)
+
+    @property
+    def results(self):
+        return self.reporter.results
+
+    @property
+    def elapsed(self):
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.time()) - self.started_at
+
+
+class JobManager:
+    """Runs jobs on a small worker pool behind a bounded queue.
+
+    `func(job)` does the work and should stop early once `job.cancel_event`
+    is set. Finished jobs stay retrievable until `max_finished` newer ones
+    have completed.
+    """
+
+    def __init__(self, max_workers=2, max_queued=8, max_finished=50):
+        self.max_queued = max_queued
+        self.max_finished = max_finished
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, func, owner, key=None, label=""):
+        with self._lock:
+            queued = sum(1 for job in self._jobs.values() if job.status == QUEUED)
+            if queued >= self.max_queued:
+                raise JobQueueFull(f"{queued} jobs are already waiting; try again when one finishes")
+            job = Job(owner, key, label)
+            self._jobs[job.id] = job
+            self._prune()
+        job.future = self._executor.submit(self._run, job, func)
+        return job
+
+    def _run(self, job, func):
+        if job.cancel_event.is_set():
+            return
+        job.status = RUNNING
+        job.started_at = time.time()
+        try:
+            func(job)
+            job.status = CANCELLED if job.cancel_event.is_set() else DONE
+        except Exception as e:
+            if job.cancel_event.is_set():
+                job.status = CANCELLED
+            else:
+                logging.exception(f"Job {job.id} failed")
+                job.error = str(e)
+                job.status = FAILED
+        finally:
+            job.finished_at = time.time()
+
+    def _prune(self):
+        finished = sorted(
+            (job for job in self._jobs.values() if not job.active),
+            key=lambda job: job.finished_at or job.created_at
+        )
+        for job in finished[:max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job.id]
+
+    def get(self, job_id):
+        return self._jobs.get(job_id)
+
+    def jobs(self, owner=None):
+        """Jobs of `owner` (or all jobs), newest first."""
+        with self._lock:
+            jobs = [job for job in self._jobs.values() if owner is None or job.owner == owner]
+        return sorted(jobs, key=lambda job: job.created_at, reverse=True)
+
+    def find(self, owner, key):
+        """Newest job of `owner` computing `key`, if any."""
+        return next((job for job in self.jobs(owner) if job.key == key), None)
+
+    def cancel(self, job_id):
+        job = self._jobs.get(job_id)
+        if job is None or not job.active:
+            return False
+        job.cancel_event.set()
+        if job.future is not None and job.future.cancel():
+            job.status = CANCELLED
+            job.finished_at = time.time()
+        return True
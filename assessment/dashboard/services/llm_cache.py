@@ -0,0 +1,80 @@
+import hashlib
+import json
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableLambda
+from .metrics import registry
+
+
+def render_prompt(prompt):
+    """Render a string, prompt value or message list into one canonical string."""
+    if isinstance(prompt, str):
+        return prompt
+    if hasattr(prompt, "to_messages"):
+        prompt = prompt.to_messages()
+    if isinstance(prompt, (list, tuple)):
+        return "\n".join(f"{getattr(m, 'type', '')}: {getattr(m, 'content', m)}" for m in prompt)
+    return str(prompt)
+
+
+def make_cache_key(model_name, temperature, prompt, **kwargs):
+    payload = json.dumps(
+        {
+            "model": model_name,
+            "temperature": temperature,
+            "prompt": hashlib.sha256(render_prompt(prompt).encode("utf-8")).hexdigest(),
+            "kwargs": kwargs,
+        },
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class CachedLLM:
+    """Wrap a chat model so identical prompts are answered from a SQLiteCache.
+
+    With `refresh`, cached answers are ignored but fresh ones are still stored.
+    `before_call` passed to `invoke` only runs when the model is actually
+    called, so callers can pace real requests without waiting on cache hits.
+    """
+
+    def __init__(self, llm, cache, refresh=False):
+        self.llm = llm
+        self.cache = cache
+        self.refresh = refresh
+
+    def refreshing(self):
+        """The same model and cache, bypassing cached answers."""
+        return CachedLLM(self.llm, self.cache, refresh=True)
+
+    @property
+    def model_name(self):
+        return getattr(self.llm, "model_name", type(self.llm).__name__)
+
+    @property
+    def temperature(self):
+        return getattr(self.llm, "temperature", None)
+
+    def invoke(self, prompt, before_call=None, **kwargs):
+        key = make_cache_key(self.model_name, self.temperature, prompt, **kwargs)
+        cached = None if self.refresh else self.cache.get(key)
+        if cached is not None:
+            registry.inc("cache_requests_total", cache="llm", result="hit")
+            return AIMessage(content=cached)
+
+        registry.inc("cache_requests_total", cache="llm", result="miss")
+        if before_call is not None:
+            before_call()
+        response = self.llm.invoke(prompt, **kwargs)
+        # Empty answers are usually transient failures, so don't pin them
+        if response.content:
+            self.cache.set(key, response.content)
+        return response
+
+    def discard(self, prompt, **kwargs):
+        """Forget the stored answer to `prompt`, e.g. because the caller could not use it."""
+        self.cache.delete(make_cache_key(self.model_name, self.temperature, prompt, **kwargs))
+
+    def bind(self, **kwargs):
+        """Mirror `Runnable.bind` so the wrapper can be piped into LangChain chains."""
+        return RunnableLambda(lambda prompt: self.invoke(prompt, **kwargs))
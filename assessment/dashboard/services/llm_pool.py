@@ -0,0 +1,204 @@
+import logging
+import os
+import re
+import threading
+import time
+from langchain_core.runnables import RunnableLambda
+from .metrics import registry, record_token_usage
+
+
+_KEY_PATTERN = re.compile(r"^GROQ_API_KEY(?:_(\d+))?$")
+
+
+def discover_api_keys(environ=None):
+    """Return [(env var name, key)] for GROQ_API_KEY, GROQ_API_KEY_1, GROQ_API_KEY_2, ..."""
+    environ = os.environ if environ is None else environ
+    found = []
+    for name, value in environ.items():
+        match = _KEY_PATTERN.match(name)
+        if match and value.strip():
+            found.append((int(match.group(1) or 0), name, value.strip()))
+    keys, seen = [], set()
+    for _, name, value in sorted(found):
+        if value not in seen:
+            seen.add(value)
+            keys.append((name, value))
+    return keys
+
+
+def parse_duration(value):
+    """Parse Groq reset/retry values such as '1.5', '7.66s', '2m59.56s' or '120ms' into seconds."""
+    if value is None:
+        return None
+    value = str(value).strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    total, matched = 0.0, False
+    for amount, unit in re.findall(r"(\d+(?:\.\d+)?)(ms|h|m|s)", value):
+        total += float(amount) * {"ms": 0.001, "s": 1, "m": 60, "h": 3600}[unit]
+        matched = True
+    return total if matched else None
+
+
+def is_rate_limit_error(error):
+    if "rate_limit_exceeded" in str(error).lower():
+        return True
+    try:
+        import groq
+    except ImportError:
+        return False
+    return isinstance(error, groq.RateLimitError)
+
+
+def retry_after_from_error(error):
+    """Seconds to wait according to the headers of a rate-limit error, if it carries any."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    return parse_duration(headers.get("retry-after")) or parse_duration(headers.get("x-ratelimit-reset-requests"))
+
+
+class KeyState:
+    """Quota bookkeeping for one API key, fed from the headers of every response."""
+
+    def __init__(self, name, client=None):
+        self.name = name
+        self.client = client
+        self.in_flight = 0
+        self.calls = 0
+        self.rate_limited = 0
+        self.remaining_requests = None
+        self.remaining_tokens = None
+        self.requests_reset_at = None
+        self.quarantined_until = 0.0
+
+    def update_from_headers(self, headers):
+        now = time.time()
+        if headers.get("x-ratelimit-remaining-requests") is not None:
+            self.remaining_requests = int(float(headers["x-ratelimit-remaining-requests"]))
+        if headers.get("x-ratelimit-remaining-tokens") is not None:
+            self.remaining_tokens = int(float(headers["x-ratelimit-remaining-tokens"]))
+        reset = parse_duration(headers.get("x-ratelimit-reset-requests"))
+        if reset is not None:
+            self.requests_reset_at = now + reset
+
+    def load(self):
+        """Sort key: keys with fewer calls in flight and more quota left come first."""
+        remaining_requests = self.remaining_requests
+        if self.requests_reset_at is not None and time.time() >= self.requests_reset_at:
+            remaining_requests = None  # The window has reset since we last heard
+        return (
+            self.in_flight,
+            -(remaining_requests if remaining_requests is not None else float("inf")),
+            -(self.remaining_tokens if self.remaining_tokens is not None else float("inf")),
+            self.calls,
+        )
+
+
+class LLMPool:
+    """Routes each call to the least-loaded of several API keys.
+
+    A key that hits a rate limit is quarantined until its Retry-After (or
+    `quarantine_seconds`) expires, and the call is retried on another key.
+    The pool exposes `invoke`/`bind` like a chat model, so every phase can
+    share one instance.
+    """
+
+    def __init__(self, states, model_name, temperature, quarantine_seconds=30.0, max_attempts=None):
+        if not states:
+            raise ValueError("LLMPool needs at least one API key")
+        self.states = states
+        self.model_name = model_name
+        self.temperature = temperature
+        self.quarantine_seconds = quarantine_seconds
+        self.max_attempts = max_attempts or 2 * len(states)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, model_name="mixtral-8x7b-32768", temperature=0.0, **kwargs):
+        """Build one ChatGroq client per key discovered in the environment."""
+        return cls.from_keys(discover_api_keys(), model_name, temperature, **kwargs)
+
+    @classmethod
+    def from_keys(cls, keys, model_name="mixtral-8x7b-32768", temperature=0.0, **kwargs):
+        """Build one ChatGroq client per (name, key) pair."""
+        import httpx
+        from langchain_groq import ChatGroq
+        states = []
+        for name, api_key in keys:
+            state = KeyState(name)
+            http_client = httpx.Client(
+                event_hooks={"response": [lambda response, state=state: state.update_from_headers(response.headers)]}
+            )
+            state.client = ChatGroq(
+                model_name=model_name,
+                temperature=temperature,
+                api_key=api_key,
+                http_client=http_client,
+                # The pool handles 429s by sidelining the key; SDK retries would sleep on it instead
+                max_retries=0
+            )
+            states.append(state)
+        return cls(states, model_name, temperature, **kwargs)
+
+    def _acquire(self):
+        while True:
+            with self._lock:
+                now = time.time()
+                available = [state for state in self.states if state.quarantined_until <= now]
+                if available:
+                    state = min(available, key=KeyState.load)
+                    state.in_flight += 1
+                    state.calls += 1
+                    return state
+                wait = min(state.quarantined_until for state in self.states) - now
+            logging.warning(f"All {len(self.states)} API keys are rate limited. Waiting {wait:.1f} seconds...")
+            time.sleep(max(wait, 0.05))
+
+    def _release(self, state):
+        with self._lock:
+            state.in_flight -= 1
+
+    def quarantine(self, state, seconds=None):
+        with self._lock:
+            state.rate_limited += 1
+            state.remaining_requests = 0
+            state.quarantined_until = time.time() + (seconds or self.quarantine_seconds)
+
+    def invoke(self, prompt, **kwargs):
+        for attempt in range(1, self.max_attempts + 1):
+            state = self._acquire()
+            try:
+                with registry.span("llm_call", key=state.name):
+                    response = state.client.invoke(prompt, **kwargs)
+                record_token_usage(response)
+                return response
+            except Exception as e:
+                if not is_rate_limit_error(e) or attempt == self.max_attempts:
+                    raise
+                registry.inc("llm_rate_limits_total", key=state.name)
+                logging.warning(f"Rate limit on {state.name}, routing the call to another key")
+                self.quarantine(state, retry_after_from_error(e))
+            finally:
+                self._release(state)
+
+    def bind(self, **kwargs):
+        """Mirror `Runnable.bind` so the pool can be piped into LangChain chains."""
+        return RunnableLambda(lambda prompt: self.invoke(prompt, **kwargs))
+
+    def stats(self):
+        now = time.time()
+        with self._lock:
+            return [
+                {
+                    "key": state.name,
+                    "calls": state.calls,
+                    "in_flight": state.in_flight,
+                    "rate_limited": state.rate_limited,
+                    "remaining_requests": state.remaining_requests,
+                    "remaining_tokens": state.remaining_tokens,
+                    "quarantined_for": max(0.0, state.quarantined_until - now),
+                }
+                for state in self.states
+            ]
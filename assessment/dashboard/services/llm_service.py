@@ -1,30 +1,50 @@
-from langchain_groq import ChatGroq
-from langchain_core.prompts import ChatPromptTemplate
-from langchain.agents import AgentExecutor, Tool, create_xml_agent
-from langchain.agents.output_parsers import XMLAgentOutputParser
-from langchain_community.tools import DuckDuckGoSearchResults
-from langchain import hub
-import streamlit as st
-import time
-import os
+from .llm_pool import LLMPool
+from .agent_prompt import get_xml_agent_prompt
+from .progress import StreamlitReporter
+from .rate_limiter import backend_limiter
+from .metrics import registry
+import threading
+
+
+_search_client = None
+_search_client_lock = threading.Lock()
+
+
+def get_search_client():
+    """Return the process-wide DuckDuckGo client, creating it on first use."""
+    global _search_client
+    with _search_client_lock:
+        if _search_client is None:
+            from langchain_community.tools import DuckDuckGoSearchResults
+            _search_client = DuckDuckGoSearchResults()
+        return _search_client
+
+
+def _fetch_search(query):
+    # Only network round-trips count against DuckDuckGo's politeness limit
+    with backend_limiter("duckduckgo", max_concurrent=2, rate=1.0).slot():
+        with registry.span("search_call", backend="duckduckgo"):
+            return get_search_client().run(query)
+
+
+def run_search(query, search_cache=None, refresh=False):
+    """Run a DuckDuckGo search, serving repeated queries from `search_cache` unless `refresh`."""
+    if search_cache is None:
+        return _fetch_search(query)
+    return search_cache.get_or_fetch(query, _fetch_search, refresh=refresh)
 
 
 def initialize_llm():
-    """Initialize LLM instances"""
-    llm1 = ChatGroq(
-        model_name="mixtral-8x7b-32768",
-        temperature=0.0,
-        api_key=os.environ.get("GROQ_API_KEY_1")
-    )
-    llm2 = ChatGroq(
-        model_name="mixtral-8x7b-32768",
-        temperature=0.0,
-        api_key=os.environ.get("GROQ_API_KEY_2")
-    )
-    return llm1, llm2
+    """Initialize LLM instances
+
+    Both phases share one pool that routes every call to the least-loaded key.
+    """
+    pool = LLMPool.from_env(model_name="mixtral-8x7b-32768", temperature=0.0)
+    return pool, pool
 
 def get_search_query_prompt():
     """Initialize search query prompt template"""
+    from langchain_core.prompts import ChatPromptTemplate
     return ChatPromptTemplate.from_messages([
         ("system", "You are an assistant that generates highly relevant search queries to retrieve information"),
         ("human", "Based on the user's query and the provided data, generate up to 2 of the most effective search queries that would likely yield relevant results."),
@@ -48,15 +68,24 @@ def convert_intermediate_steps(intermediate_steps):
 def convert_tool(tools):
     return "\n".join([f"{tool.name} : {tool.description}" for tool in tools])
 
-def setup_agent_executor(llm):
-    """Second phase: Set up the agent executor"""
+@registry.span("phase", phase="agent_setup")
+def setup_agent_executor(llm, search_cache=None, reporter=None, prompt=None, search_fn=None, refresh=False):
+    """Second phase: Set up the agent executor
+
+    `prompt` replaces the vendored xml-agent-convo prompt and `search_fn(query)`
+    the DuckDuckGo search, e.g. to run the agent offline in benchmarks. With
+    `refresh`, searches bypass `search_cache`.
+    """
+    from langchain.agents import AgentExecutor, Tool
+    from langchain.agents.output_parsers import XMLAgentOutputParser
     try:
-        prompt_hub = hub.pull("hwchase17/xml-agent-convo")
+        prompt_hub = prompt or get_xml_agent_prompt()
         
         def search(query: str) -> str:
             """search about things with duckduckgo engine"""
-            _search = DuckDuckGoSearchResults()
-            return _search.run(query)
+            if search_fn is not None:
+                return search_fn(query)
+            return run_search(query, search_cache, refresh=refresh)
         
         # Properly define the tool
         search_tool = Tool(
@@ -81,9 +110,9 @@ def setup_agent_executor(llm):
         return AgentExecutor(
             agent=agent,
             tools=tool_list,
-            verbose=True,
+            verbose=False,
             handle_parsing_errors=True
         )
     except Exception as e:
-        st.error(f"Error setting up agent executor: {e}")
+        (reporter or StreamlitReporter()).error(f"Error setting up agent executor: {e}")
         return None
@@ -0,0 +1,178 @@
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, float("inf"))
+
+
+def _label_key(labels):
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format_labels(label_key, extra=()):
+    pairs = list(label_key) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in pairs) + "}"
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus layout."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th quantile."""
+        if not self.count:
+            return 0.0
+        target, seen = q * self.count, 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= target:
+                return bound
+        return self.buckets[-1]
+
+
+class MetricsRegistry:
+    """Thread-safe counters, latency histograms and recent spans for the whole process.
+
+    Spans time a phase, an entity or a single call; each one also feeds the
+    `<name>_seconds` histogram with the same labels. Everything can be
+    exported as JSON or in the Prometheus text format.
+    """
+
+    def __init__(self, max_spans=5000):
+        self.counters = {}
+        self.histograms = {}
+        self.spans = deque(maxlen=max_spans)
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+
+    def inc(self, name, value=1, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            if key not in self.histograms:
+                self.histograms[key] = Histogram()
+            self.histograms[key].observe(value)
+
+    @contextmanager
+    def span(self, name, **labels):
+        """Time the enclosed block; usable as a context manager or a decorator."""
+        start = time.perf_counter()
+        started_at = time.time()
+        error = None
+        try:
+            yield
+        except Exception as e:
+            error = type(e).__name__
+            raise
+        finally:
+            duration = time.perf_counter() - start
+            self.observe(f"{name}_seconds", duration, **labels)
+            if error:
+                self.inc(f"{name}_errors_total", **labels)
+            with self._lock:
+                self.spans.append({
+                    "name": name,
+                    "labels": dict(labels),
+                    "start": started_at,
+                    "duration": duration,
+                    "error": error,
+                })
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+            self.spans.clear()
+            self.started_at = time.time()
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "started_at": self.started_at,
+                "counters": [
+                    {"name": name, "labels": dict(labels), "value": value}
+                    for (name, labels), value in sorted(self.counters.items())
+                ],
+                "histograms": [
+                    {
+                        "name": name,
+                        "labels": dict(labels),
+                        "count": histogram.count,
+                        "sum": histogram.sum,
+                        "p50": histogram.quantile(0.5),
+                        "p95": histogram.quantile(0.95),
+                        "buckets": dict(zip(map(str, histogram.buckets), histogram.counts)),
+                    }
+                    for (name, labels), histogram in sorted(self.histograms.items())
+                ],
+                "spans": list(self.spans),
+            }
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), indent=2, default=str)
+
+    def to_prometheus(self):
+        lines = []
+        with self._lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted(self.histograms.items())
+            typed = set()
+            for (name, labels), value in counters:
+                if name not in typed:
+                    lines.append(f"# TYPE {name} counter")
+                    typed.add(name)
+                lines.append(f"{name}{_format_labels(labels)} {value}")
+            for (name, labels), histogram in histograms:
+                if name not in typed:
+                    lines.append(f"# TYPE {name} histogram")
+                    typed.add(name)
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f"{name}_bucket{_format_labels(labels, [('le', le)])} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {histogram.sum}")
+                lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+def record_token_usage(response, **labels):
+    """Count the prompt/completion tokens reported on a chat model response, if any."""
+    usage = getattr(response, "usage_metadata", None) or {}
+    prompt_tokens = usage.get("input_tokens")
+    completion_tokens = usage.get("output_tokens")
+    if prompt_tokens is None:
+        token_usage = (getattr(response, "response_metadata", None) or {}).get("token_usage") or {}
+        prompt_tokens = token_usage.get("prompt_tokens")
+        completion_tokens = token_usage.get("completion_tokens")
+    if prompt_tokens is not None:
+        registry.inc("llm_tokens_total", prompt_tokens, kind="prompt", **labels)
+    if completion_tokens is not None:
+        registry.inc("llm_tokens_total", completion_tokens, kind="completion", **labels)
+
+
+# Process-wide registry shared by every phase and service
+registry = MetricsRegistry()
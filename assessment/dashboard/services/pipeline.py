@@ -0,0 +1,101 @@
+import logging
+import queue
+import threading
+
+# Marks the end of the input stream on a stage queue
+_DONE = object()
+
+
+class _Stage:
+    """A pool of worker threads that applies `func` to each entity from `inbox`."""
+
+    def __init__(self, name, func, workers, inbox, outbox, stop_event):
+        self.name = name
+        self.func = func
+        self.workers = max(1, workers)
+        self.inbox = inbox
+        self.outbox = outbox
+        self.stop_event = stop_event
+        self.downstream_workers = 1
+        self._finished = 0
+        self._lock = threading.Lock()
+        self.threads = [
+            threading.Thread(target=self._run, name=f"pipeline-{name}-{i}", daemon=True)
+            for i in range(self.workers)
+        ]
+
+    def _run(self):
+        while not self.stop_event.is_set():
+            try:
+                entity = self.inbox.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            if entity is _DONE:
+                break
+            try:
+                self.func(entity)
+            except Exception as e:
+                # Keep the entity moving so one failure does not stall the stream
+                logging.error(f"Pipeline stage '{self.name}' failed: {e}")
+            _put(self.outbox, entity, self.stop_event)
+
+        with self._lock:
+            self._finished += 1
+            last = self._finished == self.workers
+        if last:
+            # Every worker of this stage is done: close the next stage's input
+            for _ in range(self.downstream_workers):
+                _put(self.outbox, _DONE, self.stop_event)
+
+
+def _put(target, item, stop_event):
+    """Blocking put that gives up once the pipeline has been stopped."""
+    while not stop_event.is_set():
+        try:
+            target.put(item, timeout=0.5)
+            return
+        except queue.Full:
+            continue
+
+
+def run_streaming_pipeline(entities, stages, queue_size=16):
+    """Stream entities through `stages` and yield each one as soon as it is fully processed.
+
+    `stages` is a list of (name, func, workers) tuples; `func(entity)` updates the
+    entity dict in place. Stages are connected by bounded queues, so a slow
+    stage applies backpressure to the ones before it instead of letting work
+    pile up in memory. Results are yielded in completion order in the calling
+    thread, which makes it safe to update Streamlit widgets from the loop.
+    """
+    stop_event = threading.Event()
+    queues = [queue.Queue(maxsize=queue_size) for _ in range(len(stages) + 1)]
+    pipeline_stages = [
+        _Stage(name, func, workers, queues[i], queues[i + 1], stop_event)
+        for i, (name, func, workers) in enumerate(stages)
+    ]
+    for stage, next_stage in zip(pipeline_stages, pipeline_stages[1:]):
+        stage.downstream_workers = next_stage.workers
+
+    def feed():
+        for entity in entities:
+            if stop_event.is_set():
+                return
+            _put(queues[0], entity, stop_event)
+        for _ in range(pipeline_stages[0].workers):
+            _put(queues[0], _DONE, stop_event)
+
+    feeder = threading.Thread(target=feed, name="pipeline-feed", daemon=True)
+    feeder.start()
+    for stage in pipeline_stages:
+        for thread in stage.threads:
+            thread.start()
+
+    try:
+        while True:
+            entity = queues[-1].get()
+            if entity is _DONE:
+                break
+            yield entity
+    finally:
+        # Also reached when the consumer stops iterating early
+        stop_event.set()
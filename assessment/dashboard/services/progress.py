@@ -0,0 +1,112 @@
+import logging
+import time
+
+
+class ProgressReporter:
+    """Receives progress and status updates from the pipeline phases.
+
+    The phases in data_processor only talk to a reporter, never to Streamlit,
+    so the same code runs in the dashboard, a background job or the CLI. This
+    base class logs messages and ignores progress.
+    """
+
+    def progress(self, fraction, text=""):
+        """Update the current phase's progress (0.0 - 1.0)."""
+
+    def clear(self):
+        """The current phase finished; drop its progress indicator."""
+
+    def info(self, message):
+        logging.info(message)
+
+    def success(self, message):
+        logging.info(message)
+
+    def warning(self, message):
+        logging.warning(message)
+
+    def error(self, message):
+        logging.error(message)
+
+    def preview(self, results):
+        """Show the results gathered so far (a ResultTable)."""
+
+    def show_results(self, results):
+        """Show the finished ResultTable."""
+
+
+class StreamlitReporter(ProgressReporter):
+    """Reports into the running Streamlit script; must be used from the script thread."""
+
+    def __init__(self):
+        import streamlit as st
+        self._st = st
+        self._bar = None
+        self._table = None
+
+    def progress(self, fraction, text=""):
+        if self._bar is None:
+            self._bar = self._st.progress(0)
+        self._bar.progress(min(max(fraction, 0.0), 1.0), text)
+
+    def clear(self):
+        for placeholder in (self._bar, self._table):
+            if placeholder is not None:
+                placeholder.empty()
+        self._bar = None
+        self._table = None
+
+    def info(self, message):
+        self._st.info(message)
+
+    def success(self, message):
+        self._st.success(message)
+
+    def warning(self, message):
+        self._st.warning(message)
+
+    def error(self, message):
+        self._st.error(message)
+
+    def preview(self, results):
+        if self._table is None:
+            self._table = self._st.empty()
+        self._table.dataframe(results.to_frame(), use_container_width=True)
+
+    def show_results(self, results):
+        from .csv_handler import display_results
+        display_results(results)
+
+
+class ConsoleReporter(ProgressReporter):
+    """Prints progress for headless runs, at most once per `interval` seconds."""
+
+    def __init__(self, prefix="", interval=2.0):
+        self.prefix = prefix
+        self.interval = interval
+        self._last = 0.0
+
+    def _print(self, message):
+        print(f"{self.prefix}{message}", flush=True)
+
+    def progress(self, fraction, text=""):
+        now = time.monotonic()
+        if fraction >= 1.0 or now - self._last >= self.interval:
+            self._last = now
+            self._print(f"[{fraction:6.1%}] {text}")
+
+    def info(self, message):
+        self._print(message)
+
+    def success(self, message):
+        self._print(message)
+
+    def warning(self, message):
+        self._print(f"WARNING: {message}")
+
+    def error(self, message):
+        self._print(f"ERROR: {message}")
+
+    def show_results(self, results):
+        if results.output_path:
+            self._print(f"{len(results)} rows written to {results.output_path}")
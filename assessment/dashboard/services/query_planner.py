@@ -0,0 +1,56 @@
+import re
+from .search_cache import normalize_query
+
+
+# Words that do not change what a web search returns
+STOPWORDS = frozenset({"a", "an", "and", "at", "for", "in", "of", "on", "the", "to", "what", "whats", "is"})
+
+
+def canonical_query(query):
+    """Filler-insensitive form of a search string.
+
+    "Population of the Kent County" and "population kent county" share one
+    canonical form, so they are searched once. Word order is kept: "flights
+    from London to Paris" and "flights from Paris to London" stay distinct.
+    """
+    tokens = re.findall(r"\w+", normalize_query(query))
+    kept = [token for token in tokens if token not in STOPWORDS]
+    return " ".join(kept) or normalize_query(query)
+
+
+class QueryPlan:
+    """Distinct search queries of many entities and the entity slots each one fills.
+
+    `queries` maps a canonical query to the first original string seen for
+    it, which is the one that runs; `subscribers` maps it to every
+    (entity, position in `one_value`) that receives its result.
+    """
+
+    def __init__(self):
+        self.queries = {}
+        self.subscribers = {}
+        self.total = 0
+
+    def add(self, entity, query_idx, query):
+        key = canonical_query(query)
+        self.queries.setdefault(key, query)
+        self.subscribers.setdefault(key, []).append((entity, query_idx))
+        self.total += 1
+
+    @property
+    def distinct(self):
+        return len(self.queries)
+
+    @property
+    def dedup_ratio(self):
+        """Share of planned queries that are served by another query's result."""
+        return 1 - self.distinct / self.total if self.total else 0.0
+
+
+def plan_queries(entities, max_queries=3):
+    """Collect the first `max_queries` search queries of every entity into a QueryPlan."""
+    plan = QueryPlan()
+    for entity in entities:
+        for query_idx, query in enumerate((entity.get('search_queries') or [])[:max_queries]):
+            plan.add(entity, query_idx, query)
+    return plan
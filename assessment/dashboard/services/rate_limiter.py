@@ -0,0 +1,59 @@
+import threading
+import time
+from contextlib import contextmanager
+
+
+class TokenBucket:
+    """Thread-safe token bucket shared by every worker that talks to one API."""
+
+    def __init__(self, rate, capacity=None):
+        # rate is in requests per second, capacity is the allowed burst size
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, tokens=1):
+        """Block until `tokens` are available, returning the time spent waiting."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return waited
+                wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+
+
+class PolitenessLimiter:
+    """Caps both the concurrent requests and the request rate sent to one backend."""
+
+    def __init__(self, max_concurrent=2, rate=1.0):
+        self._semaphore = threading.BoundedSemaphore(max_concurrent)
+        self._bucket = TokenBucket(rate)
+
+    @contextmanager
+    def slot(self):
+        with self._semaphore:
+            self._bucket.acquire()
+            yield
+
+
+_backend_limiters = {}
+_backend_limiters_lock = threading.Lock()
+
+
+def backend_limiter(name, max_concurrent=2, rate=1.0):
+    """Return the process-wide limiter for backend `name`, creating it on first use."""
+    with _backend_limiters_lock:
+        if name not in _backend_limiters:
+            _backend_limiters[name] = PolitenessLimiter(max_concurrent, rate)
+        return _backend_limiters[name]
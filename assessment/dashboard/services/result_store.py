@@ -0,0 +1,174 @@
+import csv
+import io
+import os
+import threading
+import numpy as np
+import pandas as pd
+
+
+DEFAULT_OUTPUT_DIR = os.environ.get("DASHBOARD_OUTPUT_DIR", "outputs")
+# Intermediate pipeline fields that are never written to the output
+PROCESSING_KEYS = ('search_queries', 'one_value')
+
+
+def format_row(dict_element):
+    """Flatten one entity into a CSV row, dropping intermediate pipeline fields."""
+    return {
+        key: (', '.join(str(v) for v in value) if isinstance(value, list) else value)
+        for key, value in dict_element.items()
+        if key not in PROCESSING_KEYS
+    }
+
+
+def _csv_value(value):
+    """Write missing values as empty cells, like DataFrame.to_csv does on a rewrite."""
+    if value is None or (pd.api.types.is_scalar(value) and pd.isna(value)):
+        return ""
+    return value
+
+
+def output_path_for(session_id, job_id):
+    """Per-session, per-job output file so concurrent users never share one."""
+    directory = os.path.join(DEFAULT_OUTPUT_DIR, session_id)
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, f"{job_id}.csv")
+
+
+class ResultTable:
+    """Column-oriented result rows with a stable, append-only column schema.
+
+    Each finished entity is added once. With an `entity_index`, the entity's
+    result is fanned out to all of its source rows. Rows are appended to
+    `output_path` as they arrive; the file is only rewritten when a new
+    result column first appears. Background jobs add rows while the UI
+    reads them, so `add`, `to_frame` and `to_bytes` hold a lock.
+    """
+
+    def __init__(self, output_path=None, entity_index=None):
+        self.output_path = output_path
+        self.entity_index = entity_index
+        self.columns = {}  # column name -> list of values, in schema order
+        self.row_ids = []  # source row position (or entity order) of every stored row
+        self._positions = None
+        self._source = None
+        self._entity_positions = {}
+        self._lock = threading.RLock()
+        if entity_index is not None:
+            self._source = entity_index.df.reset_index(drop=True)
+            self._positions = entity_index.row_positions()
+            self._entity_positions = {id(entity): i for i, entity in enumerate(entity_index.records)}
+            for column in self._source.columns:
+                self.columns[column] = []
+        if output_path:
+            self._rewrite()
+
+    def __len__(self):
+        return len(self.row_ids)
+
+    def add(self, entity):
+        """Store the result rows of one finished entity and append them to the output file."""
+        with self._lock:
+            result = format_row(entity)
+            if self.entity_index is not None:
+                position = self._entity_positions[id(entity)]
+                row_ids = list(self._positions.get(position, []))
+                block = self._source.iloc[row_ids]
+                rows = {column: block[column].tolist() for column in self._source.columns}
+                for key, value in self._result_columns(result).items():
+                    rows[key] = [value] * len(row_ids)
+            else:
+                row_ids = [len(self.row_ids)]
+                rows = {key: [value] for key, value in result.items()}
+
+            new_columns = [column for column in rows if column not in self.columns]
+            for column in new_columns:
+                self.columns[column] = [None] * len(self.row_ids)
+            for column, values in self.columns.items():
+                values.extend(rows.get(column, [None] * len(row_ids)))
+            self.row_ids.extend(row_ids)
+
+            if self.output_path:
+                if new_columns:
+                    self._rewrite()
+                else:
+                    self._append(rows, len(row_ids))
+
+    def add_many(self, entities):
+        """Store the result rows of many finished entities at once, e.g. a whole finished job.
+
+        With an entity index, the entities' results form one column per
+        result that is fanned out to every source row with a single `take`
+        over the index codes, and the output file is written in one go.
+        """
+        entities = list(entities)
+        if self.entity_index is None:
+            for entity in entities:
+                self.add(entity)
+            return
+        if not entities:
+            return
+        with self._lock:
+            results = [self._result_columns(format_row(entity)) for entity in entities]
+            # Entity position -> index into `entities`; rows of entities not being added map to -1
+            lookup = np.full(len(self.entity_index.records), -1, dtype=np.intp)
+            lookup[[self._entity_positions[id(entity)] for entity in entities]] = np.arange(len(entities))
+            row_entities = lookup[self.entity_index.codes]
+            row_ids = np.flatnonzero(row_entities >= 0)
+            row_entities = row_entities[row_ids]
+
+            rows = {column: self._source[column].take(row_ids).tolist() for column in self._source.columns}
+            for column in dict.fromkeys(key for result in results for key in result):
+                values = pd.Series([result.get(column) for result in results], dtype=object)
+                rows[column] = values.take(row_entities).tolist()
+
+            new_columns = [column for column in rows if column not in self.columns]
+            for column in new_columns:
+                self.columns[column] = [None] * len(self.row_ids)
+            for column, values in self.columns.items():
+                values.extend(rows.get(column, [None] * len(row_ids)))
+            self.row_ids.extend(row_ids.tolist())
+
+            if self.output_path:
+                if new_columns:
+                    self._rewrite()
+                else:
+                    frame = pd.DataFrame(rows, columns=list(self.columns))
+                    frame.to_csv(self.output_path, mode='a', header=False, index=False, encoding='utf-8')
+
+    def _result_columns(self, result):
+        """The answer fields of a formatted row, renamed where they clash with a source column."""
+        return {
+            key if key not in self._source.columns else f"{key}_enriched": value
+            for key, value in result.items()
+            if key not in self.entity_index.selected_columns
+        }
+
+    def _append(self, rows, count):
+        with open(self.output_path, mode='a', newline='', encoding='utf-8') as file:
+            writer = csv.writer(file)
+            for i in range(count):
+                writer.writerow([_csv_value(rows[column][i]) if column in rows else "" for column in self.columns])
+
+    def _rewrite(self):
+        self.to_frame().to_csv(self.output_path, index=False, encoding='utf-8')
+
+    def to_frame(self):
+        """Results as a DataFrame in source row order."""
+        with self._lock:
+            frame = pd.DataFrame(self.columns, columns=list(self.columns))
+            row_ids = list(self.row_ids)
+        if row_ids:
+            frame = frame.iloc[pd.Series(row_ids).argsort().to_numpy()].reset_index(drop=True)
+        return frame
+
+    def to_bytes(self, fmt="CSV"):
+        """Serialize the results to an in-memory buffer ("CSV", "Parquet" or "Excel")."""
+        frame = self.to_frame()
+        buffer = io.BytesIO()
+        if fmt == "Parquet":
+            frame.to_parquet(buffer, index=False)
+        elif fmt == "Excel":
+            frame.to_excel(buffer, index=False, engine="openpyxl")
+        else:
+            buffer.write(frame.to_csv(index=False).encode("utf-8"))
+        return buffer.getvalue()
@@ -0,0 +1,94 @@
+import random
+import threading
+import time
+from .rate_limiter import TokenBucket
+from .llm_pool import retry_after_from_error
+from .metrics import registry
+
+
+class Cancelled(Exception):
+    """Raised by AdaptiveScheduler.acquire once its job has been cancelled."""
+
+
+class AdaptiveScheduler(TokenBucket):
+    """Central request pacer that adapts its rate to the throttling it observes.
+
+    Successful calls raise the rate additively; a rate limit cuts it
+    multiplicatively (AIMD) and pauses every caller for the Retry-After the
+    server asked for, or a jittered exponential backoff when it gave none.
+    Nothing sleeps while no throttle is in force beyond the current rate.
+    Every LLM request of a job passes through `acquire`, so setting
+    `cancel_event` stops the job at its next request.
+    """
+
+    def __init__(self, rate=1.0, min_rate=0.05, max_rate=20.0, increase=0.05, decrease=0.5,
+                 base_backoff=1.0, max_backoff=60.0, cancel_event=None):
+        super().__init__(rate, capacity=max(1.0, rate))
+        self.cancel_event = cancel_event
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.paused_until = 0.0
+        self.slept = 0.0
+        self.rate_limits = 0
+        self._stats_lock = threading.Lock()
+
+    def _set_rate(self, rate):
+        with self._lock:
+            self._refill()  # Settle tokens earned at the old rate first
+            self.rate = min(self.max_rate, max(self.min_rate, rate))
+            self.capacity = max(1.0, self.rate)
+
+    def acquire(self, tokens=1):
+        """Wait out any active pause, then take tokens at the current rate."""
+        waited = 0.0
+        while True:
+            self.check_cancelled()
+            pause = self.paused_until - time.monotonic()
+            if pause <= 0:
+                break
+            if self.cancel_event is not None:
+                self.cancel_event.wait(pause)
+            else:
+                time.sleep(pause)
+            waited += pause
+        waited += super().acquire(tokens)
+        self.check_cancelled()
+        with self._stats_lock:
+            self.slept += waited
+        registry.inc("scheduler_sleep_seconds_total", waited, reason="pacing")
+        return waited
+
+    def check_cancelled(self):
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            raise Cancelled("Job cancelled")
+
+    def backoff(self, attempt):
+        """Jittered exponential backoff for the `attempt`-th consecutive failure."""
+        delay = min(self.max_backoff, self.base_backoff * 2 ** max(0, attempt - 1))
+        return delay * random.uniform(0.5, 1.5)
+
+    def on_success(self):
+        self._set_rate(self.rate + self.increase)
+
+    def on_rate_limit(self, error=None, attempt=1):
+        """Record a throttle; every caller pauses until the server's reset time. Returns the delay."""
+        delay = retry_after_from_error(error) if error is not None else None
+        if delay is None:
+            delay = self.backoff(attempt)
+        with self._stats_lock:
+            self.rate_limits += 1
+            self.paused_until = max(self.paused_until, time.monotonic() + delay)
+        registry.inc("rate_limits_total")
+        self._set_rate(self.rate * self.decrease)
+        return delay
+
+    def stats(self):
+        return {
+            "rate": self.rate,
+            "slept": self.slept,
+            "rate_limits": self.rate_limits,
+        }
@@ -0,0 +1,98 @@
+import re
+import sys
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from .metrics import registry
+
+
+def normalize_query(query):
+    """Canonical form used as the cache key: NFKC, case-folded, single-spaced, no outer quotes."""
+    text = unicodedata.normalize("NFKC", str(query)).casefold()
+    text = re.sub(r"\s+", " ", text).strip()
+    return text.strip(" \"'`?.!")
+
+
+class SearchCache:
+    """TTL + LRU cache for search results, optionally backed by a SQLiteCache on disk.
+
+    The in-memory layer is bounded by both entry count and approximate bytes.
+    Disk size and age limits are enforced by the backing SQLiteCache.
+    """
+
+    def __init__(self, ttl=24 * 3600, max_entries=2048, max_memory_bytes=32 * 1024 * 1024, disk_cache=None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_memory_bytes = max_memory_bytes
+        self.disk_cache = disk_cache
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (stored_at, value)
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, query):
+        key = normalize_query(query)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if self.ttl and now - entry[0] > self.ttl:
+                    self._drop(key)
+                else:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    registry.inc("cache_requests_total", cache="search", result="memory_hit")
+                    return entry[1]
+
+        value = self.disk_cache.get(key) if self.disk_cache is not None else None
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                registry.inc("cache_requests_total", cache="search", result="miss")
+                return None
+            self.hits += 1
+            self._store(key, value, now)
+        registry.inc("cache_requests_total", cache="search", result="disk_hit")
+        return value
+
+    def set(self, query, value):
+        key = normalize_query(query)
+        with self._lock:
+            self._store(key, value, time.time())
+        if self.disk_cache is not None:
+            self.disk_cache.set(key, value)
+
+    def get_or_fetch(self, query, fetch, refresh=False):
+        """Return the cached result for `query`, calling `fetch(query)` on a miss (or always, with `refresh`)."""
+        value = None if refresh else self.get(query)
+        if value is None:
+            value = fetch(query)
+            if value:
+                self.set(query, value)
+        return value
+
+    def _store(self, key, value, stored_at):
+        if key in self._entries:
+            self._drop(key)
+        self._entries[key] = (stored_at, value)
+        self._memory_bytes += sys.getsizeof(key) + sys.getsizeof(value)
+        while self._entries and (
+            len(self._entries) > self.max_entries or self._memory_bytes > self.max_memory_bytes
+        ):
+            self._drop(next(iter(self._entries)))
+
+    def _drop(self, key):
+        _, value = self._entries.pop(key)
+        self._memory_bytes -= sys.getsizeof(key) + sys.getsizeof(value)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+            "memory_bytes": self._memory_bytes,
+        }
@@ -0,0 +1,276 @@
+import copy
+import logging
+import re
+import threading
+import time
+import pandas as pd
+
+
+class ReadOnlySheet(RuntimeError):
+    """Raised by SheetSync.write_back when the backend cannot write to the sheet."""
+
+
+def column_letter(index):
+    """0 -> "A", 25 -> "Z", 26 -> "AA"."""
+    letters = ""
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def column_index(letters):
+    index = 0
+    for letter in letters.upper():
+        index = index * 26 + ord(letter) - 64
+    return index - 1
+
+
+def _runs(values):
+    """Split sorted integers into runs of consecutive values: [1, 2, 3, 7] -> [[1, 2, 3], [7]]."""
+    runs = []
+    for value in values:
+        if runs and value == runs[-1][-1] + 1:
+            runs[-1].append(value)
+        else:
+            runs.append([value])
+    return runs
+
+
+def _cell(value):
+    if value is None or (isinstance(value, float) and pd.isna(value)):
+        return ""
+    return value
+
+
+def row_hashes(frame, columns=None):
+    """Stable hash of every row (of `columns` only, if given) for delta detection."""
+    if columns is not None:
+        frame = frame[list(columns)]
+    return pd.util.hash_pandas_object(frame.astype(str), index=False).tolist()
+
+
+class MemorySheetBackend:
+    """In-memory stand-in for the Sheets API, for local runs and tests.
+
+    Sheets are grids (header row first) keyed by URL. Every API call is
+    recorded in `calls` so callers can check how many requests a sync made.
+    """
+
+    writable = True
+
+    def __init__(self):
+        self.grids = {}
+        self.revisions = {}
+        self.calls = []
+
+    def put(self, url, frame):
+        self.grids[url] = [list(frame.columns)] + [[_cell(v) for v in row] for row in frame.itertuples(index=False)]
+        self.revisions[url] = self.revisions.get(url, 0) + 1
+
+    def revision(self, url):
+        self.calls.append(("revision", url))
+        return str(self.revisions[url])
+
+    def read(self, url):
+        self.calls.append(("read", url))
+        grid = copy.deepcopy(self.grids[url])
+        width = len(grid[0])
+        return pd.DataFrame([row + [""] * (width - len(row)) for row in grid[1:]], columns=grid[0])
+
+    def batch_update(self, url, updates):
+        """Apply [(A1 range, 2-D values)] in one call."""
+        self.calls.append(("batch_update", url, len(updates)))
+        grid = self.grids[url]
+        for a1_range, values in updates:
+            match = re.match(r"([A-Z]+)(\d+)", a1_range)
+            first_col, first_row = column_index(match.group(1)), int(match.group(2)) - 1
+            for i, row_values in enumerate(values):
+                while len(grid) <= first_row + i:
+                    grid.append([])
+                row = grid[first_row + i]
+                for j, value in enumerate(row_values):
+                    while len(row) <= first_col + j:
+                        row.append("")
+                    row[first_col + j] = value
+        self.revisions[url] += 1
+
+
+class GspreadBackend:
+    """Reads and writes the first worksheet of a spreadsheet through a gspread client."""
+
+    writable = True
+
+    def __init__(self, client):
+        self.client = client
+        self._spreadsheets = {}
+
+    def _spreadsheet(self, url):
+        if url not in self._spreadsheets:
+            self._spreadsheets[url] = self.client.open_by_url(url)
+        return self._spreadsheets[url]
+
+    def revision(self, url):
+        # Drive's modifiedTime, fetched fresh with one metadata request (the cached Spreadsheet's
+        # lastUpdateTime attribute is only set when it is opened); None falls back to the ttl
+        spreadsheet = self._spreadsheet(url)
+        if not hasattr(spreadsheet, "get_lastUpdateTime"):
+            return None
+        try:
+            return spreadsheet.get_lastUpdateTime()
+        except Exception as e:
+            logging.warning(f"Could not read the revision of {url}: {e}")
+            return None
+
+    def read(self, url):
+        values = self._spreadsheet(url).sheet1.get_all_values()
+        if not values:
+            return pd.DataFrame()
+        return pd.DataFrame(values[1:], columns=values[0])
+
+    def batch_update(self, url, updates):
+        self._spreadsheet(url).sheet1.batch_update(
+            [{"range": a1_range, "values": values} for a1_range, values in updates],
+            value_input_option="RAW"
+        )
+
+
+class ConnectionBackend:
+    """Read-only backend over the streamlit-gsheets connection (public sheets, no credentials)."""
+
+    writable = False
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def revision(self, url):
+        return None
+
+    def read(self, url):
+        return self.connection.read(spreadsheet=url, ttl=0)
+
+
+class SheetSync:
+    """Per-URL cache of sheet contents with delta detection and batched write-back.
+
+    `load` only downloads a sheet when its revision changed (or, for
+    backends without revisions, when `ttl` expired) and remembers which
+    rows changed since the previous download. `write_back` sends every
+    changed result cell in a single batch request, one range per block of
+    consecutive rows.
+    """
+
+    def __init__(self, backend, ttl=60.0):
+        self.backend = backend
+        self.ttl = ttl
+        self._entries = {}  # url -> {"frame", "revision", "checked_at", "hashes", "changed"}
+        self._lock = threading.Lock()
+
+    def load(self, url, force=False):
+        entry = self._entries.get(url)
+        now = time.monotonic()
+        if entry is not None and not force:
+            if now - entry["checked_at"] < self.ttl:
+                return entry["frame"]
+            revision = self.backend.revision(url)
+            if revision is not None and revision == entry["revision"]:
+                entry["checked_at"] = now
+                return entry["frame"]
+        else:
+            revision = self.backend.revision(url)
+
+        frame = self.backend.read(url)
+        hashes = row_hashes(frame)
+        previous = set(entry["hashes"]) if entry is not None else set()
+        with self._lock:
+            self._entries[url] = {
+                "frame": frame,
+                "revision": revision,
+                "checked_at": now,
+                "hashes": hashes,
+                "changed": [i for i, row_hash in enumerate(hashes) if row_hash not in previous],
+            }
+        return frame
+
+    def changed_rows(self, url):
+        """Positions of the rows that are new or different since the previous download."""
+        entry = self._entries.get(url)
+        return list(entry["changed"]) if entry is not None else []
+
+    def write_back(self, url, results, positions, columns):
+        """Write result `columns` ({frame column: sheet column}) of `results` to the sheet rows at `positions`.
+
+        Only cells that differ from the cached sheet are sent. New sheet
+        columns are appended after the last one. Returns (rows written,
+        ranges sent); no request is made when nothing changed.
+        """
+        if not self.backend.writable:
+            raise ReadOnlySheet("Writing back needs a service account in the gsheets connection secrets")
+        entry = self._entries.get(url)
+        sheet = entry["frame"] if entry is not None else self.load(url)
+        header = list(sheet.columns)
+        targets = {}
+        new_columns = []
+        for source, target in columns.items():
+            if target not in header:
+                header.append(target)
+                new_columns.append(target)
+            targets[source] = header.index(target)
+
+        changed = {}  # sheet column index -> {row position: value}
+        for source, column in targets.items():
+            values = results[source].tolist()
+            existing = sheet[header[column]].tolist() if header[column] in sheet.columns else None
+            for position, value in zip(positions, values):
+                value = _cell(value)
+                if existing is None or position >= len(existing) or str(_cell(existing[position])) != str(value):
+                    changed.setdefault(column, {})[position] = value
+
+        updates = [
+            (f"{column_letter(header.index(name))}1", [[name]]) for name in new_columns
+        ]
+        rows = set()
+        for column_run in _runs(sorted(changed)):
+            run_rows = sorted(set(position for column in column_run for position in changed[column]))
+            for row_run in _runs(run_rows):
+                values = [
+                    [changed[column].get(position, _cell(self._current(sheet, header[column], position)))
+                     for column in column_run]
+                    for position in row_run
+                ]
+                # Data row `position` is sheet row position + 2 (1-based, after the header)
+                a1_range = (f"{column_letter(column_run[0])}{row_run[0] + 2}:"
+                            f"{column_letter(column_run[-1])}{row_run[-1] + 2}")
+                updates.append((a1_range, values))
+                rows.update(row_run)
+        if not updates:
+            return 0, 0
+
+        self.backend.batch_update(url, updates)
+        self._apply(url, header, changed)
+        return len(rows), len(updates)
+
+    @staticmethod
+    def _current(sheet, column, position):
+        if column not in sheet.columns or position >= len(sheet):
+            return ""
+        return sheet[column].iloc[position]
+
+    def _apply(self, url, header, changed):
+        """Mirror a successful write in the cache so the next write only sends new changes."""
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is None:
+                return
+            frame = entry["frame"].copy()
+            for column, values in changed.items():
+                name = header[column]
+                column_values = frame[name].tolist() if name in frame.columns else [""] * len(frame)
+                for position, value in values.items():
+                    if position < len(frame):
+                        column_values[position] = value
+                frame[name] = pd.Series(column_values, index=frame.index, dtype=object)
+            entry["frame"] = frame
+            entry["hashes"] = row_hashes(frame)
+            entry["revision"] = None  # Our own write changed it; re-check on the next load
@@ -0,0 +1,66 @@
+import pickle
+import pandas as pd
+from services.entity_index import EntityIndex
+from services.result_store import ResultTable
+
+
+def make_index():
+    return EntityIndex(pd.DataFrame({
+        "County": ["Kent", "kent", "Essex", "Surrey"],
+        "Country": ["UK", "UK", "UK", "UK"],
+    }), ["County", "Country"])
+
+
+def run_in_worker(records):
+    """What a cli.py shard does: process pickled copies of the records and send them back."""
+    shard = pickle.loads(pickle.dumps(list(records)))
+    for entity in shard:
+        entity["search_queries"] = [f"{entity['County']} population"]
+        entity["one_value"] = ["some evidence"]
+        entity["Population"] = f"{len(entity['County'])}00000"
+    return pickle.loads(pickle.dumps(shard))
+
+
+def test_cli_merge_keeps_answers_without_column_copies():
+    index = make_index()
+    records = index.records
+    workers = 2
+    for i in range(workers):
+        for record, result in zip(records[i::workers], run_in_worker(records[i::workers])):
+            record.merge_results(result)
+
+    results = ResultTable(entity_index=index)
+    for record in records:
+        results.add(record)
+    frame = results.to_frame()
+
+    assert list(frame.columns) == ["County", "Country", "Population"]
+    assert frame["Population"].tolist() == ["400000", "400000", "500000", "600000"]
+    assert frame["County"].tolist() == ["Kent", "kent", "Essex", "Surrey"]
+
+
+def test_answer_named_like_a_column_does_not_overwrite_it():
+    record = make_index().records[0]
+    record["County"] = "Kent County"
+
+    assert record["County"] == "Kent"
+    assert record["County_enriched"] == "Kent County"
+
+
+def test_non_string_answer_type_is_kept():
+    record = make_index().records[0]
+    record[2021] = "1600000"
+
+    assert dict(record.items())[2021] == "1600000"
+
+
+def test_forked_index_has_its_own_records():
+    index = make_index()
+    fork = index.fork()
+    fork.records[0]["Population"] = "1600000"
+    fork.records[0]["search_queries"] = ["Kent population"]
+
+    assert "Population" not in index.records[0]
+    assert "search_queries" not in index.records[0]
+    fork.records.clear_results()
+    assert dict(fork.records[0].items()) == {"County": "Kent", "Country": "UK"}
@@ -0,0 +1,44 @@
+import pytest
+from services.extractors import FastPathExtractor, population_extractor
+
+QUERIES = ["Population of Kent County"]
+
+
+@pytest.mark.parametrize("answer", [
+    "Kent covers 3,736 square kilometres and has 1.6 million residents.",
+    "Kent has 1.6 million residents and covers 3,736 sq km.",
+    "The population was 1.6 million in 2021 and is expected to reach 1,800,000 by 2040.",
+    "Population density is 430 people per square km, total population 1.6 million.",
+    "The population grew by 120,000 to 1.6 million.",
+])
+def test_population_skips_areas_projections_and_changes(answer):
+    assert population_extractor(QUERIES, [answer]).value == "1600000"
+
+
+@pytest.mark.parametrize("answer", [
+    "The population is expected to reach 1,800,000 by 2040.",
+    "Kent's population is projected to be 1.9 million people by 2043.",
+    "Kent spans 1,368 square miles, and its population is growing.",
+])
+def test_population_without_a_current_head_count(answer):
+    assert population_extractor(QUERIES, [answer]) is None
+
+
+def test_population_prefers_the_number_nearest_the_population_word():
+    answer = "Founded 1,200 years ago, the town has 54,000 inhabitants."
+    assert population_extractor(QUERIES, [answer]).value == "54000"
+
+
+def test_agreeing_sources_skip_the_llm_but_projections_do_not_count():
+    fast_path = FastPathExtractor()
+    entity = {
+        "search_queries": QUERIES,
+        "one_value": [
+            "Kent covers 3,736 square kilometres and has 1.6 million residents.",
+            "Around 1.6 million people live in Kent, expected to reach 1,800,000 by 2040.",
+        ],
+    }
+    extraction = fast_path.extract(entity)
+
+    assert extraction.value == "1600000"
+    assert extraction.confidence == 0.95
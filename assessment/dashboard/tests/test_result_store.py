@@ -0,0 +1,39 @@
+import pandas as pd
+from services.entity_index import EntityIndex
+from services.result_store import ResultTable
+
+
+def make_index():
+    index = EntityIndex(pd.DataFrame({
+        "County": ["Kent", "Essex", "kent", "Surrey", "KENT"],
+        "Country": ["UK"] * 5,
+        "Region": ["South East", "East", "South East", "South East", "South East"],
+    }), ["County", "Country"])
+    for record, population in zip(index.records, ["1600000", None, "1200000"]):
+        record["search_queries"] = [f"{record['County']} population"]
+        record["Population"] = population
+    return index
+
+
+def test_add_many_matches_adding_one_by_one():
+    index = make_index()
+    one_by_one = ResultTable(entity_index=index)
+    for record in index.records:
+        one_by_one.add(record)
+    at_once = ResultTable(entity_index=index)
+    at_once.add_many(index.records)
+
+    pd.testing.assert_frame_equal(at_once.to_frame(), one_by_one.to_frame())
+    assert at_once.to_frame()["Population"].fillna("").tolist() == ["1600000", "", "1600000", "1200000", "1600000"]
+
+
+def test_add_many_appends_to_the_output_file(tmp_path):
+    index = make_index()
+    path = tmp_path / "results.csv"
+    results = ResultTable(str(path), entity_index=index)
+    results.add(index.records[0])
+    results.add_many(index.records[1:])
+
+    written = pd.read_csv(path, keep_default_na=False, dtype=str)
+    assert len(written) == 5
+    assert sorted(written["Population"].tolist()) == ["", "1200000", "1600000", "1600000", "1600000"]
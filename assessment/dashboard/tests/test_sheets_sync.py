@@ -0,0 +1,67 @@
+import pandas as pd
+import pytest
+from services.sheets_sync import ConnectionBackend, MemorySheetBackend, ReadOnlySheet, SheetSync
+
+URL = "memory://counties"
+
+
+def make_sync(rows=4):
+    backend = MemorySheetBackend()
+    backend.put(URL, pd.DataFrame({
+        "County": [f"County {i}" for i in range(rows)],
+        "Country": ["UK"] * rows,
+    }))
+    return backend, SheetSync(backend, ttl=0)
+
+
+def calls(backend, kind):
+    return sum(1 for call in backend.calls if call[0] == kind)
+
+
+def test_load_reads_once_while_revision_is_unchanged():
+    backend, sync = make_sync()
+    first = sync.load(URL)
+    second = sync.load(URL)
+
+    assert second is first
+    assert calls(backend, "read") == 1
+    assert calls(backend, "revision") == 2
+
+
+def test_load_reports_changed_rows_after_an_edit():
+    backend, sync = make_sync()
+    sync.load(URL)
+    assert sync.changed_rows(URL) == [0, 1, 2, 3]
+
+    backend.grids[URL][3][0] = "County X"  # data row 2
+    backend.revisions[URL] += 1
+    sync.load(URL)
+
+    assert calls(backend, "read") == 2
+    assert sync.changed_rows(URL) == [2]
+
+
+def test_write_back_sends_one_batch_and_only_changed_cells():
+    backend, sync = make_sync()
+    sync.load(URL)
+    results = pd.DataFrame({"Population": ["10", "20", "40"]})
+
+    assert sync.write_back(URL, results, [0, 1, 3], {"Population": "Population"}) == (3, 3)
+    assert calls(backend, "batch_update") == 1
+    # Header cell, rows 0-1 as one range, row 3 as another
+    assert backend.calls[-1] == ("batch_update", URL, 3)
+    assert [row[2:] for row in backend.grids[URL]] == [["Population"], ["10"], ["20"], [], ["40"]]
+
+    assert sync.write_back(URL, results, [0, 1, 3], {"Population": "Population"}) == (0, 0)
+    assert calls(backend, "batch_update") == 1
+
+    changed = pd.DataFrame({"Population": ["10", "25", "40"]})
+    assert sync.write_back(URL, changed, [0, 1, 3], {"Population": "Population"}) == (1, 1)
+    assert calls(backend, "batch_update") == 2
+    assert backend.grids[URL][2][2] == "25"
+
+
+def test_write_back_refuses_read_only_backends():
+    sync = SheetSync(ConnectionBackend(connection=None))
+    with pytest.raises(ReadOnlySheet):
+        sync.write_back(URL, pd.DataFrame({"Population": ["1"]}), [0], {"Population": "Population"})
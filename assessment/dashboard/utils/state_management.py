@@ -1,5 +1,21 @@
+import uuid
 import streamlit as st
 
 def initialize_session_state():
     if 'data' not in st.session_state:
-        st.session_state.data = None
\ No newline at end of file
+        st.session_state.data = None
+    if 'source_file' not in st.session_state:
+        st.session_state.source_file = None
+    if 'session_id' not in st.session_state:
+        st.session_state.session_id = uuid.uuid4().hex[:12]
+
+def session_cached(name, key, build):
+    """Return what `build()` made for `key` on an earlier rerun of this session, building it on a new key.
+
+    Only the latest key is kept under `name`, so switching data or query frees the old value.
+    """
+    cached = st.session_state.get(name)
+    if cached is None or cached[0] != key:
+        cached = (key, build())
+        st.session_state[name] = cached
+    return cached[1]